@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmarks of the main operations on synthetic MT2500 data.
+
+Times are compared against the stored baselines (baselines.json), which should be
+regenerated with --save when the benchmarks or the machine change.
+"""
+import sys
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from elongation.elongation import Elongation, read_csv, read_prn, write_csv
+from elongation.plot import plotter
+from elongation.synthetic import synthetic_elongations, write_synthetic_csv, write_synthetic_prn
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+
+def best_time(function, setup=None, repeat=5):
+    """
+    Time a function, taking the best of several runs.
+
+    :param function: function to time, called with the result of setup
+    :param setup: untimed function run before each call, if None, function is called without arguments
+    :param repeat: number of runs
+    :return: best time (in seconds)
+    """
+    times = []
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def fresh(elongs):
+    """
+    :return: copies of the Elongations without any cached values
+    """
+    return [
+        Elongation(elong.xs, elong.ys, elong.gauge_length, elong.sample_width, elong.sample_thickness, elong.name)
+        for elong in elongs
+    ]
+
+
+def plot(elongs):
+    """
+    Plot the Elongations (with their peaks) and draw the figure.
+    """
+    fig, ax = plt.subplots()
+    plotter(elongs, plot=(fig, ax), legend=False, peaks={'print': False, 'labels': False})
+    fig.canvas.draw()
+    plt.close(fig)
+
+
+def import_package():
+    """
+    Import the package (without the plotting) in a fresh interpreter, as the scripts do.
+    """
+    subprocess.run([sys.executable, '-c', 'import elongation.elongation'], check=True, cwd=ROOT)
+
+
+def benchmarks(tests, points, directory):
+    """
+    Generate the benchmarks for the given size.
+
+    :param tests: number of tests in the prn file (and operated upon)
+    :param points: number of points in each test
+    :param directory: directory in which to write the files
+    :return: dictionary of benchmark functions and their setups
+    """
+    prn = os.path.join(directory, 'synthetic.prn')
+    csv = os.path.join(directory, 'synthetic.csv')
+    out = os.path.join(directory, 'out.csv')
+    write_synthetic_prn(prn, tests, points)
+    write_synthetic_csv(csv, points)
+    elongs = synthetic_elongations(tests, points)
+    cleaned = [elong.cleaned() for elong in elongs]
+
+    return {
+        'import': (import_package, None),
+        'read_prn': (lambda: read_prn(prn), None),
+        'read_csv': (lambda: read_csv(csv), None),
+        'write_csv': (lambda: write_csv(elongs[0], out), None),
+        'cleaned': (lambda es: [e.cleaned() for e in es], lambda: fresh(elongs)),
+        'cropped': (lambda es: [e.cropped(10, e.xs[-1]/2) for e in es], lambda: fresh(cleaned)),
+        'smoothed': (lambda es: [e.smoothed(15) for e in es], lambda: fresh(elongs)),
+        'peak_indices': (lambda es: [e.peak_indices() for e in es], lambda: fresh(elongs)),
+        'plotter': (plot, lambda: fresh(cleaned)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark elongation and compare against the stored baselines.')
+    parser.add_argument('-t', '--tests', help='Number of tests in each file.',
+                        type=int, default=10)
+    parser.add_argument('-p', '--points', help='Number of points in each test.',
+                        type=int, default=100000)
+    parser.add_argument('-r', '--repeat', help='Number of runs of each benchmark (the best is taken).',
+                        type=int, default=5)
+    parser.add_argument('-b', '--benchmarks', help='Benchmarks to run (default: all).',
+                        type=str, nargs='+', default=None)
+    parser.add_argument('--tolerance', help='Ratio to the baseline above which a benchmark has regressed.',
+                        type=float, default=1.5)
+    parser.add_argument('--save', help='Save the times as the new baselines.',
+                        default=False, action='store_true')
+
+    args = parser.parse_args()
+
+    baselines = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES) as f:
+            baselines = json.load(f)
+
+    regressions = []
+    print(f'{"Benchmark":<32} {"Time (s)":>10} {"Baseline":>10} {"Ratio":>7}')
+    print('-'*62)
+    with tempfile.TemporaryDirectory() as directory:
+        for name, (function, setup) in benchmarks(args.tests, args.points, directory).items():
+            if args.benchmarks and name not in args.benchmarks:
+                continue
+            key = f'{name}[{args.tests}x{args.points}]'
+            seconds = best_time(function, setup, args.repeat)
+
+            baseline = baselines.get(key)
+            if baseline is None:
+                print(f'{key:<32} {seconds:10.4f} {"-":>10} {"-":>7}')
+            else:
+                ratio = seconds/baseline
+                flag = ' REGRESSED' if ratio > args.tolerance else ''
+                print(f'{key:<32} {seconds:10.4f} {baseline:10.4f} {ratio:7.2f}{flag}')
+                if flag:
+                    regressions.append(key)
+
+            if args.save:
+                baselines[key] = round(seconds, 6)
+
+    if args.save:
+        with open(BASELINES, 'w') as f:
+            json.dump(dict(sorted(baselines.items())), f, indent=4)
+            f.write('\n')
+
+    if regressions:
+        print(f'{len(regressions)} benchmark(s) regressed beyond {args.tolerance}x: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,113 @@
+import functools
 import itertools
+import json
+import mmap
 import numpy as np
+import os
+import shutil
+import tempfile
+import time
 
 from datetime import datetime
 
-from scipy import signal
-from .tools import (MyIter, compare_dictionaries, read_key_value, smooth_curve,
-                    try_to_num)
+from .tools import (MyIter, compare_dictionaries, file_hash, first_true, map_files, profiled,
+                    read_key_value, read_points, segment_first_true, segment_smooth_curve,
+                    sliding_slopes, smooth_curve, try_to_num, window_slopes)
+
+
+def cached(method):
+    """
+    Memoize an Elongation method on its kwargs.
+
+    Results are stored in the Elongation's cache, which is cleared whenever the
+    data or sample geometry are set (see Elongation.__setattr__). Any arrays in
+    the result are made read-only so that callers cannot modify the cached values.
+    Calls with unhashable kwargs are computed without caching.
+
+    :param method: method to memoize
+    :return: memoized method
+    """
+    @functools.wraps(method)
+    def wrapper(self, **kwargs):
+        key = (method.__name__, tuple(sorted(kwargs.items())))
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        except TypeError:  # unhashable kwargs
+            return method(self, **kwargs)
+
+        result = self._cache[key] = _read_only(method(self, **kwargs))
+        return result
+
+    return wrapper
+
+
+def _read_only(value):
+    """
+    Recursively mark the arrays in a (nested) result as read-only.
+
+    :param value: array, tuple, dict, or other value
+    :return: value
+    """
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, tuple):
+        for item in value:
+            _read_only(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _read_only(item)
+    return value
+
+
+def _x_limit_mask(xs, x_limit):
+    """
+    :param xs: x-values
+    :param x_limit: max x-value, or (min, max) (either may be None), None for no limit
+    :return: boolean array of the x-values within the limit, None if there is no limit
+    """
+    if x_limit is None:
+        return None
+    low, high = x_limit if isinstance(x_limit, tuple) else (None, x_limit)
+    mask = np.ones(len(xs), dtype=bool)
+    if low is not None:
+        mask &= xs >= low
+    if high is not None:
+        mask &= xs <= high
+    return mask
+
+
+def _points(result, elong, *args, **kwargs):
+    """
+    :return: number of points of the Elongation (or ElongationBatch) processed, see tools.profiled()
+    """
+    return len(elong.xs)
+
+
+def _total_points(elongs, *args, **kwargs):
+    """
+    :return: number of points of the Elongations produced, see tools.profiled()
+    """
+    return sum(len(elong.xs) for elong in elongs)
+
+
+# elb (elongation binary) format, see write_elb()
+ELB_MAGIC = 'elb:1|'
+ELB_ALIGNMENT = 64
 
 
 class Elongation:
+    # attributes which invalidate the cache of derived quantities when set
+    _cache_dependencies = ('xs', 'ys', 'gauge_length', 'sample_width', 'sample_thickness')
+
     def __init__(self, xs, ys, gauge_length, sample_width, sample_thickness, name=None):
         """
         Container for elongation data.
 
+        xs and ys are stored as read-only arrays (copied unless they already are read-only),
+        to change the data, assign new arrays.
+
         :param xs: elongation (in units of strain)
         :param ys: force (in Newtons)
         :param gauge_length: length of sample (in meters)
@@ -22,13 +117,44 @@ class Elongation:
         """
         assert len(xs) == len(ys)
 
-        self.xs = np.array(xs)
-        self.ys = np.array(ys)
+        self._cache = {}
+        self.xs = xs
+        self.ys = ys
         self.gauge_length = gauge_length  # m
         self.sample_width = sample_width  # m
         self.sample_thickness = sample_thickness  # m
         self.name = name
 
+    def __setattr__(self, name, value):
+        """
+        Set an attribute, invalidating cached values if the data or geometry change.
+
+        :param name: name of the attribute
+        :param value: value of the attribute
+        """
+        if name in ('xs', 'ys'):
+            # read-only arrays (e.g. memory-mapped data) are used without copying
+            if not (isinstance(value, np.ndarray) and not value.flags.writeable):
+                value = np.array(value)
+                value.flags.writeable = False
+        if name in self._cache_dependencies:
+            self._cache = {}
+        super().__setattr__(name, value)
+
+    def __getstate__(self):
+        """
+        Get the state for pickling (without the cache).
+        """
+        return {key: value for key, value in self.__dict__.items() if key != '_cache'}
+
+    def __setstate__(self, state):
+        """
+        Set the state when unpickling (ensures the data are read-only).
+        """
+        self._cache = {}
+        for key, value in state.items():
+            setattr(self, key, value)
+
     def __eq__(self, other):
         """
         Check if two Elongation objects are equivalent.
@@ -46,14 +172,18 @@ class Elongation:
     def copy(self):
         """
         Make a copy of the Elongation object.
+
+        The copy shares the (read-only) cached values of the original.
         """
-        return self.__class__(
-            self.xs.copy(), self.ys.copy(),
+        elong = self.__class__(
+            self.xs, self.ys,
             self.gauge_length,
             self.sample_width,
             self.sample_thickness,
             self.name
         )
+        elong._cache = dict(self._cache)
+        return elong
 
     def write(self, file_name, style=None):
         """
@@ -65,6 +195,7 @@ class Elongation:
         write_elongation(self, file_name, style=style)
 
     @property
+    @cached
     def max(self):
         """
         Determine the max strain and coordinate stress.
@@ -83,15 +214,17 @@ class Elongation:
         """
         return self.sample_thickness*self.sample_width # m x m = m²
 
-    def smoothed(self, box_pts=True):
+    @profiled('smooth', points=_points)
+    def smoothed(self, box_pts=True, method='convolve'):
         """
         Generate a smoothed version of the Elongation.
 
         :param box_pts: number of data points to convolve, if True, use default
+        :param method: smoothing method, see tools.smooth_curve()
         :return: smoothed Elongation
         """
         elong = self.copy()
-        elong.ys = smooth_curve(self.ys, box_pts)
+        elong.ys = smooth_curve(self.ys, box_pts, method, self.xs)
         return elong
 
     def cropped(self, start=None, end=None, shifted=True):
@@ -102,21 +235,58 @@ class Elongation:
         :param end: x-value at which to end
         :return: cropped Elongation object
         """
-        start_i, end_i, i = None, None, 0
+        (start_i, end_i), = self.crop_indices([(start, end)])
+        return self.cropped_index(start_i, end_i, shifted)
 
-        if start is not None:
-            for i, val in enumerate(self.xs):
-                if val > start:
-                    start_i = i
-                    break
+    def cropped_many(self, windows, shifted=True):
+        """
+        Crop the Elongation by x-value for many windows at once.
 
-        if end is not None:
-            for i, val in enumerate(self.xs[i:], start=i):
-                if val > end:
-                    end_i = i + 1
-                    break
+        :param windows: iterable of (start, end) x-values, see cropped()
+        :param shifted: shift the x-values so that they start at 0
+        :return: list of cropped Elongation objects
+        """
+        return [self.cropped_index(start_i, end_i, shifted) for start_i, end_i in self.crop_indices(windows)]
 
-        return self.cropped_index(start_i, end_i, shifted)
+    def crop_indices(self, windows):
+        """
+        Determine the indices at which to crop the Elongation by x-value.
+
+        Cropping starts at the first x-value greater than start, and ends after the first
+        subsequent x-value greater than end. Uses a binary search if the x-values are
+        monotonic, otherwise a vectorized search.
+
+        :param windows: iterable of (start, end) x-values, None for no cropping
+        :return: list of (start_i, end_i), see cropped_index()
+        """
+        windows = [(-np.inf if s is None else s, np.inf if e is None else e) for s, e in windows]
+        starts, ends = np.array(windows, dtype=float).reshape(-1, 2).T
+        n = len(self.xs)
+
+        if self.monotonic():
+            start_is = np.searchsorted(self.xs, starts, side='right')
+            # the end is searched for from the start
+            end_is = np.maximum(np.searchsorted(self.xs, ends, side='right'), start_is)
+        else:
+            start_is = np.array([first_true(self.xs > start, n) for start in starts], dtype=int)
+            end_is = np.array([
+                i + first_true(self.xs[i:] > end, n - i) for i, end in zip(start_is, ends)
+            ], dtype=int)
+
+        # if the start is not found, no cropping occurs (the end is not found either)
+        return [
+            (int(start_i) if start_i < n else None, int(end_i) + 1 if end_i < n else None)
+            for start_i, end_i in zip(start_is, end_is)
+        ]
+
+    @cached
+    def monotonic(self):
+        """
+        Check if the x-values are monotonically non-decreasing.
+
+        :return: True if monotonic
+        """
+        return bool(np.all(np.diff(self.xs) >= 0))
 
     def cropped_index(self, start_i=None, end_i=None, shifted=True):
         """
@@ -134,6 +304,7 @@ class Elongation:
 
         return self.__class__(xs, ys, self.gauge_length, self.sample_width, self.sample_thickness, self.name)
 
+    @profiled('clean', points=_points)
     def cleaned(self, start_threshold=0.01, end_threshold=0.25, shifted=True):
         """
         Remove the slack at the beginning and post-break at the end.
@@ -148,34 +319,46 @@ class Elongation:
 
         if start_threshold is not None:
             # includes the value before threshold is met
-            for i, y in enumerate(self.ys[1:]):
-                if y > max_y*start_threshold:
-                    start_i = i
-                    break
+            start_i = first_true(self.ys[1:] > max_y*start_threshold)
 
         if end_threshold is not None:
-            for i, y in enumerate(self.ys[max_i:], start=max_i):
-                if y < max_y*end_threshold:
-                    end_i = i
-                    break
+            end_i = first_true(self.ys[max_i:] < max_y*end_threshold)
+            end_i = None if end_i is None else max_i + end_i
 
         return self.cropped_index(start_i, end_i, shifted)
 
     @property
-    def youngs_modulus(self, x_limit=None):
+    def youngs_modulus(self):
         """
         Determine the Young's modulus of the Elongation.
 
         Modulus is calculated as the peak of the derivative of the stress strain curve.
+        See fitted_youngs_modulus() for a less noisy estimate that can be limited in x.
 
         :return: Young's modulus (units of Pa)
         """
-        if x_limit is not None:
-            raise NotImplementedError('Limits on x not yet implemented, see youngs_modulus_array().')
-
         return max(self.youngs_modulus_array)
 
+    def fitted_youngs_modulus(self, window=10, x_limit=None, width=None):
+        """
+        Determine the Young's modulus of the Elongation by linear regression.
+
+        A line is fit to each sliding window (in O(n), see tools.sliding_slopes), and
+        the steepest is taken.
+
+        :param window: number of points in each window
+        :param x_limit: max x-value (or (min, max), either may be None) of the points to fit
+        :param width: if given, each window instead spans this much strain (the strain must
+            be increasing, e.g. after cleaning), windows with fewer than `window` points are skipped
+        :return: Young's modulus (units of Pa), NaN if no window fits within the limits
+        """
+        slopes = sliding_slopes(self.xs, self.ys, window, _x_limit_mask(self.xs, x_limit), width)
+        if np.isnan(slopes).all():
+            return np.nan
+        return np.nanmax(slopes)/self.cross_section
+
     @property
+    @cached
     def youngs_modulus_array(self):
         """
         Determine the Young's modulus at all points on the Elongation.
@@ -184,6 +367,7 @@ class Elongation:
         """
         return self.derivative()/self.cross_section  # N/ΔL · L₀/A
 
+    @cached
     def derivative(self):
         """
         :return: derivative
@@ -202,20 +386,18 @@ class Elongation:
         peaks, properties = self.peak_indices(**kwargs)
         return self.xs[peaks], properties
 
+    @cached
     def peak_indices(self, **kwargs):
         """
         Finds the location of peaks in the Elongation.
 
-        Utilizes scipy.signal.find_peaks and the parameters therein.
+        Utilizes scipy.signal.find_peaks and the parameters therein. The result
+        is cached, and should not be modified.
 
         :param **kwargs: kwargs for scipy.signal.find_peaks
         :return: peak indices, properties
         """
-        kwarg_defaults = {
-            'width': 5,  # ensure small spikes are ignored
-        }
-        kwarg_defaults.update(kwargs)
-        return signal.find_peaks(self.ys, **kwarg_defaults)
+        return _find_peaks(self.ys, **kwargs)
 
     def break_index(self, **kwargs):
         """
@@ -257,6 +439,511 @@ class Elongation:
     def yield_strength(self, **kwargs):
         return self.yield_load(**kwargs)/self.cross_section
 
+    def summary(self, **kwargs):
+        """
+        Determine all of the mechanical metrics at once (see SUMMARY_FIELDS).
+
+        Equivalent to calling the yield_*, max, break_* and youngs_modulus methods, but
+        the peaks are only found once. Yield and break are NaN if there are no peaks. The
+        Young's modulus ignores NaNs in the derivative (e.g. from repeated points), as in
+        ElongationBatch.summary().
+
+        :param **kwargs: see peaks()
+        :return: dictionary of the name and metrics
+        """
+        peak_is, _ = self.peak_indices(**kwargs)
+        max_x, max_y = self.max
+        yield_x, yield_y = (self.xs[peak_is[0]], self.ys[peak_is[0]]) if len(peak_is) else (np.nan, np.nan)
+        break_x, break_y = (self.xs[peak_is[-1]], self.ys[peak_is[-1]]) if len(peak_is) else (np.nan, np.nan)
+
+        return {
+            'name': self.name,
+            'yield_elongation': yield_x,
+            'yield_load': yield_y,
+            'yield_strength': yield_y/self.cross_section,
+            'max_elongation': max_x,
+            'max_load': max_y,
+            'max_strength': max_y/self.cross_section,
+            'break_elongation': break_x,
+            'break_load': break_y,
+            'break_strength': break_y/self.cross_section,
+            'youngs_modulus': np.fmax.reduce(self.youngs_modulus_array),
+        }
+
+
+# metrics determined by Elongation.summary() and ElongationBatch.summary()
+SUMMARY_FIELDS = (
+    'yield_elongation', 'yield_load', 'yield_strength',
+    'max_elongation', 'max_load', 'max_strength',
+    'break_elongation', 'break_load', 'break_strength',
+    'youngs_modulus',
+)
+
+
+@profiled('find_peaks', points=lambda peaks, ys, **kwargs: len(ys))
+def _find_peaks(ys, **kwargs):
+    """
+    Find the peaks of a curve with scipy.signal.find_peaks, see Elongation.peak_indices().
+
+    :param ys: the curve
+    :param **kwargs: kwargs for scipy.signal.find_peaks
+    :return: peak indices, properties
+    """
+    kwarg_defaults = {
+        'width': 5,  # ensure small spikes are ignored
+    }
+    kwarg_defaults.update(kwargs)
+    # imported here, as scipy.signal takes longer to import than the rest of the package
+    from scipy import signal
+    return signal.find_peaks(ys, **kwarg_defaults)
+
+
+class ElongationBatch:
+    def __init__(self, xs, ys, offsets, gauge_lengths, sample_widths, sample_thicknesses, names=None):
+        """
+        Columnar container for many Elongations.
+
+        The data of all of the Elongations are concatenated, with curve i stored in
+        xs[offsets[i]:offsets[i + 1]] and ys[offsets[i]:offsets[i + 1]].
+
+        :param xs: concatenated elongations (in units of strain)
+        :param ys: concatenated forces (in Newtons)
+        :param offsets: index at which each curve starts, followed by the total length
+        :param gauge_lengths: lengths of the samples (in meters)
+        :param sample_widths: widths of the samples (in meters)
+        :param sample_thicknesses: thicknesses of the samples (in meters)
+        :param names: optional names for the Elongations
+        """
+        self.xs = np.asarray(xs, dtype=float)
+        self.ys = np.asarray(ys, dtype=float)
+        self.offsets = np.asarray(offsets, dtype=int)
+        self.gauge_lengths = np.asarray(gauge_lengths, dtype=float)  # m
+        self.sample_widths = np.asarray(sample_widths, dtype=float)  # m
+        self.sample_thicknesses = np.asarray(sample_thicknesses, dtype=float)  # m
+        self.names = [None]*len(self) if names is None else list(names)
+
+        assert len(self.xs) == len(self.ys) == self.offsets[-1]
+        assert self.offsets[0] == 0 and all(np.diff(self.offsets) >= 0)
+        assert len(self.gauge_lengths) == len(self.sample_widths) == len(self.sample_thicknesses) == len(self)
+        assert len(self.names) == len(self)
+
+    @classmethod
+    def from_elongations(cls, elongs):
+        """
+        Make an ElongationBatch from Elongation objects.
+
+        :param elongs: iterable of Elongation objects
+        :return: ElongationBatch
+        """
+        elongs = list(elongs)
+        return cls(
+            np.concatenate([elong.xs for elong in elongs] or [[]]),
+            np.concatenate([elong.ys for elong in elongs] or [[]]),
+            np.concatenate(([0], np.cumsum([len(elong.xs) for elong in elongs], dtype=int))),
+            [elong.gauge_length for elong in elongs],
+            [elong.sample_width for elong in elongs],
+            [elong.sample_thickness for elong in elongs],
+            [elong.name for elong in elongs],
+        )
+
+    def to_elongations(self):
+        """
+        Split into Elongation objects.
+
+        :return: list of Elongation objects
+        """
+        return [self[i] for i in range(len(self))]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        """
+        Get the ith Elongation.
+
+        :param i: index of the Elongation (negative indices count from the end)
+        :return: Elongation object
+        """
+        if not -len(self) <= i < len(self):
+            raise IndexError(f'ElongationBatch index out of range: {i}')
+        i %= len(self)
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return Elongation(
+            self.xs[start:end], self.ys[start:end],
+            float(self.gauge_lengths[i]),
+            float(self.sample_widths[i]),
+            float(self.sample_thicknesses[i]),
+            self.names[i],
+        )
+
+    @property
+    def lengths(self):
+        """
+        :return: number of points in each curve
+        """
+        return np.diff(self.offsets)
+
+    @property
+    def max(self):
+        """
+        Determine the max strain and coordinate stress of each curve.
+
+        :return: stresses, max_strains
+        """
+        max_is, max_ys = self._maxima()
+        return self.xs[max_is], max_ys
+
+    def _maxima(self):
+        """
+        Find the (first) max of each curve, ignoring NaNs.
+
+        :return: indices (into the concatenated data) of the maxima, max of each curve
+        """
+        assert all(self.lengths > 0), 'Cannot determine the max of an empty curve.'
+        max_ys = np.fmax.reduceat(self.ys, self.offsets[:-1])
+        if np.isnan(max_ys).any():
+            raise ValueError('All-NaN Elongation encountered.')
+        max_is = segment_first_true(self.ys == np.repeat(max_ys, self.lengths), self.offsets[:-1], self.offsets[1:])
+        return max_is, max_ys
+
+    @property
+    def cross_section(self):
+        """
+        Cross sectional area of each material.
+
+        :return: cross_sections in m²
+        """
+        return self.sample_thicknesses*self.sample_widths  # m x m = m²
+
+    def derivative(self):
+        """
+        Derivative of each curve, see Elongation.derivative().
+
+        :return: concatenated derivatives, offsets (each curve has one value fewer than its points)
+        """
+        assert all(self.lengths > 0), 'Cannot differentiate an empty curve.'
+        derivative = np.diff(self.ys)/np.diff(self.xs)  # ΔN/ΔL · L₀
+        # remove the values spanning neighboring curves
+        derivative = np.delete(derivative, self.offsets[1:-1] - 1)
+        return derivative, self.offsets - np.arange(len(self.offsets))
+
+    def youngs_modulus_array(self):
+        """
+        Young's modulus at all points on each curve, see Elongation.youngs_modulus_array.
+
+        :return: concatenated Young's moduli (units of Pa), offsets
+        """
+        derivative, offsets = self.derivative()
+        return derivative/np.repeat(self.cross_section, np.diff(offsets)), offsets  # N/ΔL · L₀/A
+
+    def youngs_modulus(self):
+        """
+        Young's modulus of each curve, the peak of its derivative (ignoring NaNs).
+
+        :return: Young's moduli (units of Pa)
+        """
+        moduli, offsets = self.youngs_modulus_array()
+        assert all(np.diff(offsets) > 0), 'Curves must have at least two points.'
+        return np.fmax.reduceat(moduli, offsets[:-1])
+
+    def fitted_youngs_modulus(self, window=10, x_limit=None, width=None):
+        """
+        Young's modulus of each curve by linear regression, see Elongation.fitted_youngs_modulus().
+
+        The windows of all curves are fit at once, skipping those spanning neighboring curves.
+
+        :param window: number of points in each window
+        :param x_limit: max x-value (or (min, max), either may be None) of the points to fit
+        :param width: if given, each window instead spans this much strain
+        :return: Young's moduli (units of Pa), NaN for curves without a window within the limits
+        """
+        assert all(self.lengths > 0), 'Cannot determine the modulus of an empty curve.'
+        if window < 2:
+            raise ValueError(f'Window must contain at least 2 points, got {window}.')
+        # a window starts at each point, and is cut short at the end of its curve
+        starts = np.arange(len(self.xs))
+        curve_ends = np.repeat(self.offsets[1:], self.lengths)
+        if width is None:
+            ends = np.minimum(starts + window, curve_ends)
+        else:
+            ends = np.empty_like(starts)
+            for start, end in zip(self.offsets[:-1], self.offsets[1:]):
+                xs = self.xs[start:end]
+                if np.any(np.diff(xs) < 0):
+                    raise ValueError('Windows of a width require sorted xs.')
+                ends[start:end] = start + np.searchsorted(xs, xs + width, side='right')
+        slopes = window_slopes(self.xs, self.ys, starts, ends, _x_limit_mask(self.xs, x_limit))
+        slopes[ends - starts < window] = np.nan
+        return np.fmax.reduceat(slopes, self.offsets[:-1])/self.cross_section
+
+    def summary(self, **kwargs):
+        """
+        Determine all of the mechanical metrics of each curve, see Elongation.summary().
+
+        The maxima and Young's moduli are found for all curves at once, the peaks are found
+        for each curve in turn.
+
+        :param **kwargs: see Elongation.peaks()
+        :return: structured array with the name and metrics (SUMMARY_FIELDS) of each curve
+        """
+        summary = np.zeros(len(self), dtype=[('name', object)] + [(field, float) for field in SUMMARY_FIELDS])
+        summary['name'] = self.names
+
+        max_is, max_ys = self._maxima()
+        summary['max_elongation'] = self.xs[max_is]
+        summary['max_load'] = max_ys
+        summary['youngs_modulus'] = self.youngs_modulus()
+
+        yield_is, break_is = np.full(len(self), -1), np.full(len(self), -1)
+        for i, (start, end) in enumerate(zip(self.offsets[:-1], self.offsets[1:])):
+            peak_is, _ = _find_peaks(self.ys[start:end], **kwargs)
+            if len(peak_is):
+                yield_is[i], break_is[i] = start + peak_is[0], start + peak_is[-1]
+        for metric, idxs in [('yield', yield_is), ('break', break_is)]:
+            summary[f'{metric}_elongation'] = np.where(idxs >= 0, self.xs[idxs], np.nan)
+            summary[f'{metric}_load'] = np.where(idxs >= 0, self.ys[idxs], np.nan)
+
+        for metric in ['yield', 'max', 'break']:
+            summary[f'{metric}_strength'] = summary[f'{metric}_load']/self.cross_section
+        return summary
+
+    @profiled('smooth', points=_points)
+    def smoothed(self, box_pts=True, method='convolve'):
+        """
+        Generate smoothed versions of the curves, see Elongation.smoothed().
+
+        :param box_pts: number of data points to convolve, if True, use default
+        :param method: smoothing method, see tools.smooth_curve()
+        :return: smoothed ElongationBatch
+        """
+        return self.__class__(
+            self.xs.copy(), segment_smooth_curve(self.ys, self.offsets, box_pts, method, self.xs), self.offsets.copy(),
+            self.gauge_lengths.copy(), self.sample_widths.copy(), self.sample_thicknesses.copy(),
+            self.names
+        )
+
+    def cropped_index(self, start_is, end_is, shifted=True):
+        """
+        Crop each curve by index.
+
+        :param start_is: index at which to start each curve (None for the beginning)
+        :param end_is: index at which to end each curve (None for the end)
+        :param shifted: shift the x-values so that they start at 0
+        :return: cropped ElongationBatch
+        """
+        lengths = self.lengths
+        starts = np.array([0 if i is None else i for i in start_is], dtype=int)
+        ends = np.array([length if i is None else i for i, length in zip(end_is, lengths)], dtype=int)
+        # handle negative indices and out of bounds as in slicing
+        starts = np.clip(np.where(starts < 0, starts + lengths, starts), 0, lengths)
+        ends = np.clip(np.where(ends < 0, ends + lengths, ends), 0, lengths)
+        new_lengths = np.maximum(ends - starts, 0)
+
+        offsets = np.concatenate(([0], np.cumsum(new_lengths)))
+        idxs = np.arange(offsets[-1]) + np.repeat(self.offsets[:-1] + starts - offsets[:-1], new_lengths)
+        xs = self.xs[idxs]
+        if shifted:
+            xs = xs - np.repeat(xs[offsets[:-1][new_lengths > 0]], new_lengths[new_lengths > 0])
+
+        return self.__class__(
+            xs, self.ys[idxs], offsets,
+            self.gauge_lengths, self.sample_widths, self.sample_thicknesses, self.names
+        )
+
+    @profiled('clean', points=_points)
+    def cleaned(self, start_threshold=0.01, end_threshold=0.25, shifted=True):
+        """
+        Remove the slack at the beginning and post-break at the end of each curve.
+
+        See Elongation.cleaned(), the thresholds are found for all curves at once.
+
+        :param start_threshold: threshold of max for starting
+        :param end_threshold: threshold of max for break
+        :param shifted: shift the x-values so that they start at 0
+        :return: cleaned ElongationBatch
+        """
+        starts, ends, lengths = self.offsets[:-1], self.offsets[1:], self.lengths
+        max_is, max_ys = self._maxima()
+
+        start_is, end_is = [None]*len(self), [None]*len(self)
+        if start_threshold is not None:
+            # includes the value before threshold is met
+            crossings = segment_first_true(self.ys > np.repeat(max_ys*start_threshold, lengths), starts + 1, ends)
+            start_is = [None if c < 0 else c - start - 1 for c, start in zip(crossings, starts)]
+        if end_threshold is not None:
+            crossings = segment_first_true(self.ys < np.repeat(max_ys*end_threshold, lengths), max_is, ends)
+            end_is = [None if c < 0 else c - start for c, start in zip(crossings, starts)]
+
+        return self.cropped_index(start_is, end_is, shifted)
+
+    def resampled(self, xs=None, points=1000):
+        """
+        Resample the curves onto a common strain grid by linear interpolation.
+
+        Each curve's x-values must be non-decreasing (e.g. cleaned).
+
+        :param xs: strain grid, if None, evenly spaced from the smallest to the largest strain
+        :param points: number of points in the default grid
+        :return: grid, 2-D array of resampled ys (one row per curve, NaN beyond each curve's strains)
+        """
+        assert all(self.lengths > 0), 'Cannot resample an empty curve.'
+        ids = np.repeat(np.arange(len(self)), self.lengths)
+        steps = np.diff(self.xs)[ids[1:] == ids[:-1]]
+        if np.isnan(self.xs).any() or np.any(steps < 0):
+            raise ValueError('Curves must have non-decreasing x-values to be resampled, try cleaning them.')
+
+        grid = np.linspace(self.xs.min(), self.xs.max(), points) if xs is None else np.asarray(xs, dtype=float)
+        ys = np.empty((len(self), len(grid)))
+        for row, start, end in zip(ys, self.offsets[:-1], self.offsets[1:]):
+            row[:] = np.interp(grid, self.xs[start:end], self.ys[start:end], left=np.nan, right=np.nan)
+        return grid, ys
+
+    def averaged(self, xs=None, points=1000, percentiles=(5, 95), name=None):
+        """
+        Average the curves on a common strain grid, see resampled().
+
+        :param xs: strain grid, if None, evenly spaced from the smallest to the largest strain
+        :param points: number of points in the default grid
+        :param percentiles: percentiles of the bands to determine
+        :param name: name of the averaged Elongation
+        :return: AveragedElongation of the mean curve (with the mean geometry)
+        """
+        grid, ys = self.resampled(xs, points)
+        return AveragedElongation(
+            grid, np.nanmean(ys, axis=0),
+            self.gauge_lengths.mean(), self.sample_widths.mean(), self.sample_thicknesses.mean(), name,
+            std=np.nanstd(ys, axis=0),
+            bands=dict(zip(percentiles, np.nanpercentile(ys, percentiles, axis=0))) if percentiles else {},
+            counts=np.sum(~np.isnan(ys), axis=0),
+        )
+
+    def copy(self):
+        """
+        Make a copy of the ElongationBatch.
+        """
+        return self.__class__(
+            self.xs.copy(), self.ys.copy(), self.offsets.copy(),
+            self.gauge_lengths.copy(), self.sample_widths.copy(), self.sample_thicknesses.copy(),
+            self.names
+        )
+
+
+class AveragedElongation(Elongation):
+    def __init__(self, xs, ys, gauge_length, sample_width, sample_thickness, name=None,
+                 std=None, bands=None, counts=None):
+        """
+        Mean of many Elongations, with the spread about it, see ElongationBatch.averaged().
+
+        Elongations derived from it (e.g. cropped) do not keep the spread.
+
+        :param xs: elongation (in units of strain)
+        :param ys: mean force (in Newtons)
+        :param gauge_length: length of sample (in meters)
+        :param sample width: width of sample (in meters)
+        :param sample_thickness: thickness of sample (in meters)
+        :param name: optional name for the Elongation
+        :param std: standard deviation of the force at each x-value
+        :param bands: dictionary of the force at each x-value for each percentile
+        :param counts: number of Elongations averaged at each x-value
+        """
+        super().__init__(xs, ys, gauge_length, sample_width, sample_thickness, name)
+        self.std = std
+        self.bands = {} if bands is None else bands
+        self.counts = counts
+
+    def copy(self):
+        """
+        Make a copy of the AveragedElongation (sharing the spread).
+        """
+        elong = super().copy()
+        elong.std, elong.bands, elong.counts = self.std, self.bands, self.counts
+        return elong
+
+
+class LazyElongation(Elongation):
+    def __init__(self, xs, ys, gauge_length, sample_width, sample_thickness, name=None,
+                 loader=None, metadata=None):
+        """
+        Elongation whose data are only loaded on first access.
+
+        :param xs: elongation (in units of strain), None to load with loader
+        :param ys: force (in Newtons), None to load with loader
+        :param gauge_length: length of sample (in meters)
+        :param sample width: width of sample (in meters)
+        :param sample_thickness: thickness of sample (in meters)
+        :param name: optional name for the Elongation
+        :param loader: (picklable) function that returns an Elongation with the data
+        :param metadata: optional dictionary of metadata from the file
+        """
+        if xs is None and ys is None:
+            assert loader is not None, 'A loader is needed if no data is given.'
+            self._cache = {}
+            self.gauge_length = gauge_length  # m
+            self.sample_width = sample_width  # m
+            self.sample_thickness = sample_thickness  # m
+            self.name = name
+        else:
+            super().__init__(xs, ys, gauge_length, sample_width, sample_thickness, name)
+        self.loader = loader
+        self.metadata = {} if metadata is None else metadata
+
+    def __getattr__(self, name):
+        """
+        Load the data when first accessed.
+        """
+        if name in ('xs', 'ys') and self.__dict__.get('loader') is not None:
+            self.load()
+            return self.__dict__[name]
+        raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
+
+    @property
+    def loaded(self):
+        """
+        :return: True if the data have been loaded
+        """
+        return 'xs' in self.__dict__
+
+    def load(self):
+        """
+        Load the data (the geometry and name are kept as they are).
+        """
+        elong = self.loader()
+        self.xs, self.ys = elong.xs, elong.ys
+
+
+def clean_elongations(elongs, start_threshold=0.01, end_threshold=0.25, shifted=True):
+    """
+    Remove the slack at the beginning and post-break at the end of many Elongations.
+
+    Equivalent to calling Elongation.cleaned() on each, but the thresholds for all of
+    the Elongations are found at once (see ElongationBatch.cleaned()).
+
+    :param elongs: list of (non-empty) Elongation objects
+    :param start_threshold: threshold of max for starting
+    :param end_threshold: threshold of max for break
+    :param shifted: shift the x-values so that they start at 0
+    :return: list of cleaned Elongation objects
+    """
+    if not elongs:
+        return []
+    batch = ElongationBatch.from_elongations(elongs)
+    return batch.cleaned(start_threshold, end_threshold, shifted).to_elongations()
+
+
+def average_elongations(elongs, xs=None, points=1000, percentiles=(5, 95), name=None):
+    """
+    Average replicate Elongations on a common strain grid, see ElongationBatch.averaged().
+
+    :param elongs: list of Elongation objects (with non-decreasing x-values)
+    :param xs: strain grid, if None, evenly spaced from the smallest to the largest strain
+    :param points: number of points in the default grid
+    :param percentiles: percentiles of the bands to determine
+    :param name: name of the averaged Elongation
+    :return: AveragedElongation
+    """
+    batch = ElongationBatch.from_elongations(elongs)
+    return batch.averaged(xs, points, percentiles, name)
+
 
 def write_elongation(elongation, file_name, style=None):
     """
@@ -270,12 +957,15 @@ def write_elongation(elongation, file_name, style=None):
 
     if style == 'csv':
         write_csv(elongation, file_name)
+    elif style == 'elb':
+        write_elb(elongation, file_name)
     elif style == 'prn':
         raise NotImplementedError()
     else:
         raise NotImplementedError()
 
 
+@profiled('write_csv', points=_points)
 def write_csv(elongation, file_name):
     """
     Write Elongation object to a csv file.
@@ -284,52 +974,413 @@ def write_csv(elongation, file_name):
     :param file_name: name of the file to be written to
     """
     e = elongation
-
-    with open(file_name, 'w') as f:
-        f.write(f"""\
-Break Load, {e.break_load()}
-Break Strength, {e.break_strength()}
-Break Elongation, {e.break_elongation()}
-Yield Load, {e.yield_load()}
-Yield Strength, {e.yield_strength()}
-Yield Elongation, {e.yield_elongation()}
+    peak_indices, _ = e.peak_indices()
+    break_i, yield_i = peak_indices[-1], peak_indices[0]
+    break_load, yield_load = e.ys[break_i], e.ys[yield_i]
+
+    header = f"""\
+Break Load, {break_load}
+Break Strength, {break_load/e.cross_section}
+Break Elongation, {e.xs[break_i]}
+Yield Load, {yield_load}
+Yield Strength, {yield_load/e.cross_section}
+Yield Elongation, {e.xs[yield_i]}
 Gauge Length, {e.gauge_length}
 Sample Width, {e.sample_width}
 Sample Thickness, {e.sample_thickness}
 
 Points
-   %,       N""")
-        for x, y in zip(e.xs, e.ys):
-            f.write(f'\n{x:>8.4f}, {y:>8.4f}')
+   %,       N"""
+
+    with open(file_name, 'w') as f:
+        f.write(header)
+        # format in chunks, so that only a chunk of the text is held in memory at once
+        for start in range(0, len(e.xs), 2**14):
+            points = np.column_stack((e.xs[start:start + 2**14], e.ys[start:start + 2**14])).ravel().tolist()
+            f.write(('\n%8.4f, %8.4f'*(len(points)//2)) % tuple(points))
+
 
+@profiled('write_elb', points=_points)
+def write_elb(elongation, file_name):
+    """
+    Write Elongation object to an elb (elongation binary) file.
+
+    The file consists of a JSON header line, padded with spaces so that the data starts
+    at a multiple of ELB_ALIGNMENT bytes, followed by the xs and ys as little-endian float64.
 
-def read_elongations(file_names):
+    :param: Elongation object
+    :param file_name: name of the file to be written to
+    """
+    e = elongation
+    header = json.dumps({
+        'points': len(e.xs),
+        'gauge_length': e.gauge_length,
+        'sample_width': e.sample_width,
+        'sample_thickness': e.sample_thickness,
+        'name': e.name,
+    }, default=str)
+    header = ELB_MAGIC + header
+    header += ' '*(-(len(header.encode()) + 1) % ELB_ALIGNMENT) + '\n'
+
+    with open(file_name, 'wb') as f:
+        f.write(header.encode())
+        f.write(np.asarray(e.xs, dtype='<f8').tobytes())
+        f.write(np.asarray(e.ys, dtype='<f8').tobytes())
+
+
+def read_elongations(file_names, n_jobs=1, executor=None, errors='raise', cache=None):
     """
     Read an iterable of elongation files.
 
     :param file_names: name of elongation files
-    :return: list of Elongation objects.
+    :param n_jobs: number of processes to read with (None for all cores)
+    :param executor: concurrent.futures.Executor to read with (overrides n_jobs)
+    :param errors: 'raise' to stop at the first unreadable file, 'warn' to warn and skip it
+    :param cache: ParseCache (or name of its directory) to read through, None for no caching
+    :return: list of Elongation objects (in the order of the files).
+    """
+    return list(iter_elongations(file_names, n_jobs, executor, errors, cache=cache))
+
+
+def iter_elongations(file_names, n_jobs=1, executor=None, errors='raise', prefetch=None, cache=None):
+    """
+    Lazily read an iterable of elongation files.
+
+    Elongations are yielded as each file is read, so that only the files currently
+    being read (at most `prefetch` when reading in parallel) are held in memory.
+
+    :param file_names: name of elongation files
+    :param n_jobs: number of processes to read with (None for all cores)
+    :param executor: concurrent.futures.Executor to read with (overrides n_jobs)
+    :param errors: 'raise' to stop at the first unreadable file, 'warn' to warn and skip it
+    :param prefetch: number of files to read ahead in parallel (None for twice the number of cores)
+    :param cache: ParseCache (or name of its directory) to read through, None for no caching
+    :yield: Elongation objects (in the order of the files)
+    """
+    read = functools.partial(read_elongation, cache=cache)
+    for _, elongs in map_files(read, file_names, n_jobs, executor, errors, prefetch):
+        yield from elongs
+
+
+def convert_elongation(file_name, style='csv'):
+    """
+    Convert an elongation file to another format.
+
+    Each Elongation in the file is written to `{base_name}.{style}`, numbered as
+    `{base_name}-{i}.{style}` if there are several.
+
+    :param file_name: name of the file to convert
+    :param style: format to convert to
+    :return: names of the written files
+    """
+    return _convert_elongation(file_name, style)[0]
+
+
+def _convert_elongation(file_name, style='csv'):
+    """
+    Convert an elongation file to another format, see convert_elongation().
+
+    :return: names of the written files, number of points converted
+    """
+    base_name, extension = file_name.rsplit('.', 1)
+    elongs = read_elongation(file_name)
+
+    new_names = []
+    for i, elong in enumerate(elongs, start=1):
+        number = f'-{i}' if len(elongs) > 1 else ''
+        new_names.append(f'{base_name}{number}.{style}')
+        elong.write(new_names[-1])
+
+    return new_names, sum(len(elong.xs) for elong in elongs)
+
+
+def convert_elongations(file_names, style='csv', n_jobs=1, executor=None, errors='warn',
+                        manifest=None, use_hash=False):
+    """
+    Convert many elongation files to another format, see convert_elongation().
+
+    If a manifest is given, the conversion is incremental: files are skipped if they are
+    unchanged since they were recorded in the manifest (same size and modification time,
+    or, if use_hash, the same content) and all of their converted files still exist.
+
+    :param file_names: names of the files to convert
+    :param style: format to convert to
+    :param n_jobs: number of processes to convert with (None for all cores)
+    :param executor: concurrent.futures.Executor to convert with (overrides n_jobs)
+    :param errors: 'raise' to stop at the first failure, 'warn' to warn and skip the file
+    :param manifest: name of the (JSON) manifest file, created if it doesn't exist
+    :param use_hash: compare the content hash of files whose modification time has changed
+    :return: summary dictionary with the number of files converted, skipped, and failed,
+        the number of points converted, and the time taken (in seconds)
+    """
+    start = time.perf_counter()
+    records = {}
+    if manifest is not None and os.path.exists(manifest):
+        with open(manifest) as f:
+            records = json.load(f)
+
+    to_convert, skipped = [], 0
+    for file_name in file_names:
+        if manifest is not None and _unchanged(file_name, records, style, use_hash):
+            skipped += 1
+            continue
+        to_convert.append(file_name)
+
+    converted, points = 0, 0
+    convert = functools.partial(_convert_elongation, style=style)
+    for file_name, (new_names, num_points) in map_files(convert, to_convert, n_jobs, executor, errors):
+        converted += 1
+        points += num_points
+        if manifest is None:
+            continue
+        records[os.path.abspath(file_name)] = {
+            **_file_stamp(file_name, use_hash),
+            'style': style,
+            'outputs': [os.path.abspath(new_name) for new_name in new_names],
+        }
+
+    if manifest is not None:
+        with open(manifest, 'w') as f:
+            json.dump(records, f, indent=1)
+
+    return {
+        'converted': converted,
+        'skipped': skipped,
+        'failed': len(to_convert) - converted,
+        'points': points,
+        'time': time.perf_counter() - start,
+    }
+
+
+def _file_stamp(file_name, use_hash=False):
+    """
+    :param file_name: name of the file
+    :param use_hash: include the sha256 of the file's contents
+    :return: dictionary of the size, modification time (and hash) of the file
+    """
+    stat = os.stat(file_name)
+    stamp = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if use_hash:
+        stamp['sha256'] = file_hash(file_name)
+    return stamp
+
+
+def _unchanged(file_name, records, style, use_hash=False):
     """
-    return list(itertools.chain(*(read_elongation(f) for f in file_names)))
+    Check if a file is unchanged since it was recorded in a conversion manifest.
 
+    If the file is unchanged but has a new modification time, its record is updated.
 
-def read_elongation(file_name):
+    :param file_name: name of the file
+    :param records: manifest records, keyed by absolute file name
+    :param style: format being converted to
+    :param use_hash: compare content hashes if the modification time has changed
+    :return: True if the file does not need to be converted
+    """
+    record = records.get(os.path.abspath(file_name))
+    if record is None or record['style'] != style:
+        return False
+    if not all(os.path.exists(output) for output in record['outputs']):
+        return False
+
+    stamp = _file_stamp(file_name)
+    if (stamp['size'], stamp['mtime_ns']) == (record['size'], record['mtime_ns']):
+        return True
+    if use_hash and stamp['size'] == record['size'] and file_hash(file_name) == record.get('sha256'):
+        record.update(stamp)
+        return True
+    return False
+
+
+def read_elongation(file_name, cache=None):
     """
     Read an elongation file.
 
     :param file_name: name of the file
+    :param cache: ParseCache (or name of its directory) to read through, None for no caching
     :return: list of Elongation objects
     """
+    if cache is not None:
+        cache = ParseCache(cache) if isinstance(cache, str) else cache
+        return cache.read(file_name)
+
     extension = file_name.split('.')[-1]
 
     if extension == 'prn':
         return read_prn(file_name)
     elif extension == 'csv':
         return read_csv(file_name)
+    elif extension == 'elb':
+        return read_elb(file_name)
     else:
         raise NotImplementedError(f'Reading {extension} files is not yet implemented.')
 
 
+class ParseCache:
+    # increment when changes to the parsers would change the parsed Elongations
+    version = 1
+    # file with the running total of the entries' sizes, so that puts need not scan the cache
+    ledger = '.size'
+    # number of lines after which the ledger is compacted
+    ledger_lines = 64
+    # fraction of max_size to which evictions shrink the cache
+    low_water = 0.75
+
+    def __init__(self, directory, max_size=2**30):
+        """
+        On-disk cache of parsed elongation files.
+
+        Entries are keyed by the hash of the file's contents (and the parser version),
+        so changed files are never served from the cache. The Elongations are stored in
+        elb format and memory-mapped when read. When the cache grows beyond max_size,
+        the least recently used entries are removed (see evict()).
+
+        :param directory: directory in which to store the cache (created if needed)
+        :param max_size: maximum size of the cache (in bytes)
+        """
+        self.directory = directory
+        self.max_size = max_size
+
+    def key(self, file_name):
+        """
+        :param file_name: name of the file
+        :return: key of the file in the cache
+        """
+        extension = file_name.split('.')[-1]
+        return f'{file_hash(file_name)}-{extension}-v{self.version}'
+
+    def read(self, file_name):
+        """
+        Read an elongation file, from the cache if possible.
+
+        :param file_name: name of the file
+        :return: list of Elongation objects
+        """
+        key = self.key(file_name)
+        elongs = self.get(key)
+        if elongs is None:
+            elongs = read_elongation(file_name)
+            self.put(key, elongs)
+        return elongs
+
+    def get(self, key):
+        """
+        :param key: key of the entry
+        :return: list of Elongation objects, None if not in the cache
+        """
+        entry = os.path.join(self.directory, key)
+        try:
+            os.utime(entry)  # mark as recently used
+            elb_names = sorted(os.listdir(entry), key=lambda name: int(name.split('.')[0]))
+        except FileNotFoundError:
+            return None
+        return [read_elb(os.path.join(entry, elb_name))[0] for elb_name in elb_names]
+
+    def put(self, key, elongs):
+        """
+        Add an entry to the cache, then evict entries if the cache is too large.
+
+        The size of the cache is tracked in the ledger, so only evictions scan the cache.
+
+        :param key: key of the entry
+        :param elongs: list of Elongation objects
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        entry = os.path.join(self.directory, key)
+        # write to a temporary directory and rename, so that partial entries are never read
+        tmp_entry = tempfile.mkdtemp(dir=self.directory, prefix='.tmp-')
+        for i, elong in enumerate(elongs):
+            write_elb(elong, os.path.join(tmp_entry, f'{i}.elb'))
+        size = sum(f.stat().st_size for f in os.scandir(tmp_entry))
+        try:
+            os.rename(tmp_entry, entry)
+        except OSError:  # already added (e.g. by another process)
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            return
+
+        sizes = self._read_ledger()
+        if sizes is None:
+            self.evict()
+            return
+        total = sum(sizes) + size
+        if total > self.max_size:
+            self.evict()
+        elif len(sizes) >= self.ledger_lines:
+            # compact the ledger, so that it stays quick to read
+            # (sizes appended concurrently may be lost, until the next eviction rescans the cache)
+            self._write_ledger(total)
+        else:
+            # appends of a line are atomic, so concurrent processes can share the ledger
+            with open(os.path.join(self.directory, self.ledger), 'a') as f:
+                f.write(f'{size}\n')
+
+    def _read_ledger(self):
+        """
+        :return: list of sizes in the ledger (summing to the total size of the entries),
+            None if there is no ledger
+        """
+        try:
+            with open(os.path.join(self.directory, self.ledger)) as f:
+                return [int(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return None
+
+    def _write_ledger(self, total):
+        """
+        Replace the ledger with the given total.
+
+        :param total: total size of the entries (in bytes)
+        """
+        tmp_name = os.path.join(self.directory, f'.tmp-{os.getpid()}-{self.ledger[1:]}')
+        with open(tmp_name, 'w') as f:
+            f.write(f'{total}\n')
+        os.replace(tmp_name, os.path.join(self.directory, self.ledger))
+
+    def entries(self):
+        """
+        :return: list of (last use, size, path) of each entry in the cache
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith('.') or not entry.is_dir():
+                continue
+            size = sum(f.stat().st_size for f in os.scandir(entry.path))
+            entries.append((entry.stat().st_mtime_ns, size, entry.path))
+        return entries
+
+    @property
+    def size(self):
+        """
+        :return: total size of the entries in the cache (in bytes)
+        """
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """
+        If the cache is larger than max_size, remove the least recently used entries until
+        it is no larger than low_water*max_size (so that evictions, and the scans of the
+        cache they require, are infrequent). Rewrites the ledger with the actual size.
+        """
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_size:
+            for _, size, path in entries:
+                if total <= self.low_water*self.max_size:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+        self._write_ledger(total)
+
+    def clear(self):
+        """
+        Remove all entries from the cache.
+        """
+        for _, _, path in self.entries():
+            shutil.rmtree(path, ignore_errors=True)
+        self._write_ledger(0)
+
+
+@profiled('read_prn', points=_total_points)
 def read_prn(file_name):
     """
     Read a prn file.
@@ -454,17 +1505,11 @@ Doc={MT2500:14|
                     key, value = read_key_value(line)
                     test_data[i][key] = try_to_num(value)
 
-                xs, ys = [], []
-                for line in f:
-                    if ']' in line:
-                        break
-                    x, y = line.split(',')
-                    xs.append(x)
-                    ys.append(y)
-
-                test_data[i]['xs'] = np.array(xs, dtype='float')
-                test_data[i]['ys'] = np.array(ys, dtype='float')
-                assert int(test_data[i]['Number_Of_Points']) == len(xs)
+                points = f.take_points(test_data[i]['Number_Of_Points'])
+                assert len(points) == test_data[i]['Number_Of_Points']
+                assert ']' in next(f)
+                test_data[i]['xs'] = points[:, 0]
+                test_data[i]['ys'] = points[:, 1]
                 assert next(f).strip()[0] == '}'  # may have a comma
 
             assert 'Test_Results=(' == next(f).strip()
@@ -484,68 +1529,208 @@ Doc={MT2500:14|
             print(f._index, f._line)
             raise
 
-    data_remove = ['Number_Of_Points']
-    results_swaps = [
-        ('TestDate', 'date'),
-        ('Length_Cnvrsn', 'length_conversion'),
-        ('Force_Cnvrsn', 'force_conversion'),
-        ('LoadCell_Capacity', 'loadcell_capacity'),
-        ('LoadCell_CpctyUnit', 'loadcell_capacity_unit'),
-        ('LoadCell_BitsOfReso', 'loadcell_bits_of_resolution'),
-        ('Slack_time', 'slack_time'),
-        ('BreakStrength', 'break_strength'),
-        ('BreakElongation', 'break_elongation'),
-        ('BreakPctElongation', 'break_percent_elongation'),
-        ('YieldStrength1', 'yield_strength'),
-        ('YieldLoad1', 'yield_load'),
-        ('SampleThickness', 'thickness'),
-        ('BreakLoad', 'break_load'),
-    ]
-    results_remove = ['Analysis']
-    data_swaps = [
-        ('X_unit', 'x_units'),
-        ('Y_unit', 'y_units'),
-        ('Crosshead_speed', 'crosshead_speed'),
-        ('Sample_Thkness', 'sample_thickness'),
-        ('Sample_Width', 'sample_width'),
-        ('Grip_Separation', 'gauge_length'),
-        ('Start_Threshhold', 'start_threshhold'),
-        ('Stop_Threshhold', 'stop_threshhold'),
-    ]
-
     elongations = []
     assert len(test_data) == len(test_results)
     for data, results in zip(test_data, test_results):
-        for original, to in data_swaps:
-            data[to] = data.pop(original)
-        for original, to in results_swaps:
-            results[to] = results.pop(original)
-        for key in data_remove:
-            data.pop(key)
-        for key in results_remove:
-            results.pop(key)
-
-        if data['x_units'] == 'Secs.':
-            data['x_units'] = 's'
-        if data['y_units'] == 'Newtons':
-            data['y_units'] = 'N'
-        if results['date']:
-            results['date'] = datetime.strptime(results['date'], '%d %b, %Y')
-
-        xs = data['xs']*float(data['crosshead_speed'])
-        elongations.append(
-            Elongation(
-                xs, data['ys'],
-                float(data['gauge_length']) / 1e3,  # mm → m
-                float(data['sample_width']) / 1e3,  # mm → m
-                float(data['sample_thickness']) / 1e3,  # mm → m
-                None
-            )
-        )
+        _prn_results(results)
+        elongations.append(_prn_elongation(data))
 
     return elongations
 
 
+PRN_DATA_SWAPS = [
+    ('X_unit', 'x_units'),
+    ('Y_unit', 'y_units'),
+    ('Crosshead_speed', 'crosshead_speed'),
+    ('Sample_Thkness', 'sample_thickness'),
+    ('Sample_Width', 'sample_width'),
+    ('Grip_Separation', 'gauge_length'),
+    ('Start_Threshhold', 'start_threshhold'),
+    ('Stop_Threshhold', 'stop_threshhold'),
+]
+PRN_DATA_REMOVE = ['Number_Of_Points']
+PRN_RESULTS_SWAPS = [
+    ('TestDate', 'date'),
+    ('Length_Cnvrsn', 'length_conversion'),
+    ('Force_Cnvrsn', 'force_conversion'),
+    ('LoadCell_Capacity', 'loadcell_capacity'),
+    ('LoadCell_CpctyUnit', 'loadcell_capacity_unit'),
+    ('LoadCell_BitsOfReso', 'loadcell_bits_of_resolution'),
+    ('Slack_time', 'slack_time'),
+    ('BreakStrength', 'break_strength'),
+    ('BreakElongation', 'break_elongation'),
+    ('BreakPctElongation', 'break_percent_elongation'),
+    ('YieldStrength1', 'yield_strength'),
+    ('YieldLoad1', 'yield_load'),
+    ('SampleThickness', 'thickness'),
+    ('BreakLoad', 'break_load'),
+]
+PRN_RESULTS_REMOVE = ['Analysis']
+
+
+def _prn_data(data):
+    """
+    Rename the keys of the data of a prn test (in place) and simplify the units.
+
+    :param data: dictionary of the test header
+    :return: data
+    """
+    for original, to in PRN_DATA_SWAPS:
+        data[to] = data.pop(original)
+    for key in PRN_DATA_REMOVE:
+        data.pop(key)
+
+    if data['x_units'] == 'Secs.':
+        data['x_units'] = 's'
+    if data['y_units'] == 'Newtons':
+        data['y_units'] = 'N'
+
+    return data
+
+
+def _prn_geometry(data):
+    """
+    :param data: dictionary of the (renamed) test header
+    :return: gauge_length, sample_width, sample_thickness (in meters)
+    """
+    return (
+        float(data['gauge_length']) / 1e3,  # mm → m
+        float(data['sample_width']) / 1e3,  # mm → m
+        float(data['sample_thickness']) / 1e3,  # mm → m
+    )
+
+
+def _prn_elongation(data):
+    """
+    Make an Elongation from the data of a prn test (renames the keys of data in place).
+
+    :param data: dictionary of the test header, with the points as 'xs' and 'ys'
+    :return: Elongation object
+    """
+    _prn_data(data)
+    xs = data['xs']*float(data['crosshead_speed'])
+    return Elongation(xs, data['ys'], *_prn_geometry(data), None)
+
+
+def _prn_results(results):
+    """
+    Rename the keys of the results of a prn test (in place) and parse the date.
+
+    :param results: dictionary of the test results
+    :return: results
+    """
+    for original, to in PRN_RESULTS_SWAPS:
+        results[to] = results.pop(original)
+    for key in PRN_RESULTS_REMOVE:
+        results.pop(key)
+
+    if results['date']:
+        results['date'] = datetime.strptime(results['date'], '%d %b, %Y')
+
+    return results
+
+
+def _read_prn_block(lines):
+    """
+    Read the key-values of a prn test block, until its points or closing brace.
+
+    :param lines: lines of the block (after the opening line)
+    :return: dictionary of values
+    """
+    block = {}
+    for line in lines:
+        if '}' in line or '[' in line:
+            break
+        key, value = read_key_value(line)
+        block[key] = try_to_num(value)
+    return block
+
+
+def index_prn(file_name, save=False):
+    """
+    Index the location of each test in a prn file.
+
+    Finds the byte offsets of the header, points, and results of each test in a single
+    pass over the (memory-mapped) file, without parsing the points.
+
+    :param file_name: name of the file
+    :param save: save the index to a sidecar file (`{file_name}.idx`), see load_prn_index()
+    :return: list of dictionaries of offsets for each test, with keys:
+        header, points (start of the first point), points_end (end of the last point), results
+    """
+    with open(file_name, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data_start = mm.find(b'Test_Data=(')
+        results_start = mm.find(b'Test_Results=(', data_start)
+        assert data_start >= 0 and results_start >= 0, f'{file_name} is not an MT2500 prn file.'
+
+        index = []
+        header = mm.find(b'{6|', data_start, results_start)
+        while header >= 0:
+            points = mm.find(b'\n', mm.find(b'Points = [', header)) + 1
+            # the closing bracket is on its own line
+            points_end = max(points, mm.rfind(b'\n', points, mm.find(b']', points)) + 1)
+            index.append({'header': header, 'points': points, 'points_end': points_end})
+            header = mm.find(b'{6|', points_end, results_start)
+
+        results = mm.find(b'{6|', results_start)
+        for test in index:
+            assert results >= 0, f'Fewer results than tests in {file_name}.'
+            test['results'] = results
+            results = mm.find(b'{6|', results + 1)
+        assert results < 0, f'More results than tests in {file_name}.'
+
+    if save:
+        stat = os.stat(file_name)
+        with open(f'{file_name}.idx', 'w') as f:
+            json.dump({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'tests': index}, f)
+
+    return index
+
+
+def load_prn_index(file_name):
+    """
+    Load the saved index of a prn file, see index_prn().
+
+    :param file_name: name of the prn file (not of the index)
+    :return: index, None if there is no index or it is out of date
+    """
+    try:
+        with open(f'{file_name}.idx') as f:
+            saved = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    stat = os.stat(file_name)
+    if (saved['size'], saved['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+        return None
+    return saved['tests']
+
+
+def read_prn_test(file_name, n, index=None):
+    """
+    Read a single test from a prn file, only reading the parts of the file it needs.
+
+    :param file_name: name of the file
+    :param n: index of the test
+    :param index: index of the file, loaded (see load_prn_index()) or generated if None
+    :return: Elongation object
+    """
+    if index is None:
+        index = load_prn_index(file_name) or index_prn(file_name)
+    test = index[n]
+
+    with open(file_name, 'rb') as f:
+        f.seek(test['header'])
+        header = f.read(test['points'] - test['header']).decode()
+        points = read_points(f.read(test['points_end'] - test['points']).decode())
+
+    data = _read_prn_block(header.splitlines()[1:])
+    assert len(points) == data['Number_Of_Points']
+    data['xs'], data['ys'] = points[:, 0], points[:, 1]
+    return _prn_elongation(data)
+
+
+@profiled('read_csv', points=_total_points)
 def read_csv(file_name):
     """
     Read a csv file.
@@ -553,34 +1738,19 @@ def read_csv(file_name):
     :param file_name: name of the file
     :return: list of Elongation objects (currently only a single item in list).
     """
-    data = {}
     with open(file_name) as f:
         f = MyIter(f)
         try:
-            for line in f:
-                if not line.strip():
-                    continue
-                if line == 'Points\n':
-                    break
-                key, val = read_key_value(line, separator=',')
-                key = key.lower().replace(' ', '_')
-                data[key] = val
-
-            x_units, y_units = next(f).split(',')
-            data['x_units'], data['y_units'] = x_units.strip(), y_units.strip()
-
-            xs, ys = [], []
-            for line in f:
-                x, y = line.split(',')
-                xs.append(float(x.strip()))
-                ys.append(float(y.strip()))
+            data = _read_csv_header(f)
+            # convert in chunks, so that only a chunk of the text is held in memory at once
+            points = np.concatenate([f.convert_points(text) for text in f.read_chunks()] or [np.empty((0, 2))])
         except Exception as e:
             print(f'Error on line {f._index}')
             print(f._line)
             raise e
 
     elong = Elongation(
-        np.array(xs), np.array(ys),
+        points[:, 0], points[:, 1],
         float(data['gauge_length']),
         float(data['sample_width']),
         float(data['sample_thickness'])
@@ -588,6 +1758,209 @@ def read_csv(file_name):
     return [elong]
 
 
+def _read_csv_header(f):
+    """
+    Read the header of a csv file, up to and including the units of the points.
+
+    :param f: MyIter of the lines of the file
+    :return: dictionary of header values
+    """
+    data = {}
+    for line in f:
+        if not line.strip():
+            continue
+        if line == 'Points\n':
+            break
+        key, val = read_key_value(line, separator=',')
+        key = key.lower().replace(' ', '_')
+        data[key] = val
+
+    x_units, y_units = next(f).split(',')
+    data['x_units'], data['y_units'] = x_units.strip(), y_units.strip()
+    return data
+
+
+@profiled('read_elb', points=_total_points)
+def read_elb(file_name, memory_map=True):
+    """
+    Read an elb (elongation binary) file, see write_elb().
+
+    :param file_name: name of the file
+    :param memory_map: memory-map the data (read-only) rather than reading it into memory
+    :return: list of Elongation objects (currently only a single item in list).
+    """
+    with open(file_name, 'rb') as f:
+        data = _read_elb_header(f, file_name)
+        offset = f.tell()
+
+        shape = (2, data['points'])
+        if memory_map and data['points']:
+            points = np.memmap(f, dtype='<f8', mode='r', offset=offset, shape=shape)
+        else:
+            points = np.fromfile(f, dtype='<f8', count=2*data['points']).reshape(shape)
+            points.flags.writeable = False
+
+    elong = Elongation(
+        points[0], points[1],
+        data['gauge_length'],
+        data['sample_width'],
+        data['sample_thickness'],
+        data['name']
+    )
+    return [elong]
+
+
+def _read_elb_header(f, file_name):
+    """
+    Read the header of an elb file.
+
+    :param f: file opened in binary mode
+    :param file_name: name of the file (for errors)
+    :return: dictionary of header values
+    """
+    header = f.readline().decode()
+    assert header.startswith(ELB_MAGIC), f'{file_name} is not an elb file.'
+    return json.loads(header[len(ELB_MAGIC):])
+
+
+def scan_elongations(file_names, n_jobs=1, executor=None, errors='raise'):
+    """
+    Scan the metadata of an iterable of elongation files, see scan_elongation().
+
+    :param file_names: name of elongation files
+    :param n_jobs: number of processes to scan with (None for all cores)
+    :param executor: concurrent.futures.Executor to scan with (overrides n_jobs)
+    :param errors: 'raise' to stop at the first unreadable file, 'warn' to warn and skip it
+    :return: list of LazyElongation objects (in the order of the files).
+    """
+    results = map_files(scan_elongation, file_names, n_jobs, executor, errors)
+    return [elong for _, elongs in results for elong in elongs]
+
+
+def scan_elongation(file_name):
+    """
+    Scan the metadata of an elongation file, without reading the points.
+
+    :param file_name: name of the file
+    :return: list of LazyElongation objects, which read their points on first access
+    """
+    extension = file_name.split('.')[-1]
+
+    if extension == 'prn':
+        return scan_prn(file_name)
+    elif extension == 'csv':
+        return scan_csv(file_name)
+    elif extension == 'elb':
+        return scan_elb(file_name)
+    else:
+        raise NotImplementedError(f'Scanning {extension} files is not yet implemented.')
+
+
+def scan_prn(file_name, index=None):
+    """
+    Scan the metadata of a prn file.
+
+    Reads the Film, Test_Info, and the header and results of each test, skipping the
+    points (see index_prn()).
+
+    :param file_name: name of the file
+    :param index: index of the file, loaded (see load_prn_index()) or generated if None
+    :return: list of LazyElongation objects, with metadata:
+        film, test_info, data (test header), and results
+    """
+    if index is None:
+        index = load_prn_index(file_name) or index_prn(file_name)
+
+    with open(file_name, 'rb') as f:
+        lines = f.read(index[0]['header'] if index else -1).decode().splitlines()
+        sections, section = {}, None
+        for line in lines[3:]:
+            line = line.strip()
+            if line.endswith('|'):
+                section = sections[line.split('=')[0]] = {}
+            elif line == '}':
+                section = None
+            elif section is not None:
+                key, value = read_key_value(line)
+                section[key] = value
+            else:
+                break
+
+        elongs = []
+        for i, test in enumerate(index):
+            f.seek(test['header'])
+            data = _read_prn_block(f.read(test['points'] - test['header']).decode().splitlines()[1:])
+            f.seek(test['results'])
+            results = _read_prn_block(line.decode() for line in itertools.islice(f, 1, None))
+            _prn_data(data)
+            _prn_results(results)
+
+            elongs.append(LazyElongation(
+                None, None, *_prn_geometry(data),
+                loader=functools.partial(read_prn_test, file_name, i, index),
+                metadata={
+                    'film': sections.get('Film', {}),
+                    'test_info': sections.get('Test_Info', {}),
+                    'data': data,
+                    'results': results,
+                },
+            ))
+
+    return elongs
+
+
+def scan_csv(file_name):
+    """
+    Scan the metadata of a csv file.
+
+    :param file_name: name of the file
+    :return: list of LazyElongation objects (currently only a single item in list),
+        with the header as metadata
+    """
+    with open(file_name) as f:
+        data = _read_csv_header(MyIter(f))
+
+    elong = LazyElongation(
+        None, None,
+        float(data['gauge_length']),
+        float(data['sample_width']),
+        float(data['sample_thickness']),
+        loader=functools.partial(_first, read_csv, file_name),
+        metadata=data,
+    )
+    return [elong]
+
+
+def scan_elb(file_name):
+    """
+    Scan the metadata of an elb file.
+
+    :param file_name: name of the file
+    :return: list of LazyElongation objects (currently only a single item in list),
+        with the header as metadata
+    """
+    with open(file_name, 'rb') as f:
+        data = _read_elb_header(f, file_name)
+
+    elong = LazyElongation(
+        None, None,
+        data['gauge_length'],
+        data['sample_width'],
+        data['sample_thickness'],
+        data['name'],
+        loader=functools.partial(_first, read_elb, file_name),
+        metadata=data,
+    )
+    return [elong]
+
+
+def _first(reader, file_name):
+    """
+    :return: the first Elongation read from a file by reader
+    """
+    return reader(file_name)[0]
+
+
 if __name__ == "__main__":
     elongs = read_prn('../test/test_files/test1.prn')
     elongs = read_elongation('../test/test_files/test1.prn')
@@ -1,8 +1,18 @@
+import os
 import numpy as np
 
 import matplotlib
 import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from itertools import cycle
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+
+from .tools import decimate_curve, prefetched, profile_stage, profiled
 
 
 def plotter(
@@ -14,6 +24,7 @@ def plotter(
     smoothed=False,
     legend=True, colors=None, markers=None, linestyles=None,
     peaks=False, youngs_modulus=False,
+    decimate=False, collection=False,
     savefig=None,
 ):
     """
@@ -23,13 +34,16 @@ def plotter(
     :param plot: (figure, axis) on which to plot, generates new figure if None
     :param x*: x-axis setup parameters
     :param y*: y-axis setup parameters
-    :param smoothed: number of points with which to smooth
+    :param smoothed: number of points with which to smooth, or dictionary of smoothing
+        parameters (box_pts and method, see Elongation.smoothed)
     :param legend: boolean to plot legend
     :param colors: colors to plot the spectra
     :param markers: markers to plot the spectra
     :param linestyles: linestyles to plot the spectra
     :param peaks: dictionary of peak picking parameters
     :param youngs_modulus: dictionary of Young's modulus picking parameters
+    :param decimate: dictionary of decimation parameters (see plot_elongation)
+    :param collection: draw all of the curves as a single LineCollection (see plot_elongations)
     :param savefig: where to save the figure
     :return: figure and axes
     """
@@ -41,19 +55,22 @@ def plotter(
     setup_axis(ax, style, title, xlim, xticks, xticks_minor, xlabel, ylim, yticks, yticks_minor, ylabel)
 
     if smoothed:
-        elongs = [elong.smoothed(smoothed) for elong in elongs]
+        smoothing = smoothed if isinstance(smoothed, dict) else {'box_pts': smoothed}
+        elongs = [elong.smoothed(**smoothing) for elong in elongs]
 
     plot_elongations(
         elongs, ax, style,
         markers=markers, linestyles=linestyles, colors=colors,
-        peaks=peaks, youngs_modulus=youngs_modulus
+        peaks=peaks, youngs_modulus=youngs_modulus, decimate=decimate,
+        collection=collection
     )
 
     if legend:
         ax.legend()
 
     if savefig:
-        fig.savefig(savefig)
+        with profile_stage('render'):
+            fig.savefig(savefig)
 
     return fig, ax
 
@@ -61,7 +78,8 @@ def plotter(
 def plot_elongations(
     elongs, ax, style='stress/strain',
     markers=None, linestyles=None, colors=None,
-    peaks=False, youngs_modulus=False
+    peaks=False, youngs_modulus=False, decimate=False,
+    collection=False, legend_limit=20,
 ):
     """
     Plot Elongations on an axis.
@@ -74,8 +92,19 @@ def plot_elongations(
     :param colors: the colors to use
     :param peaks: dictionary of peak picking parameters
     :param youngs_modulus: dictionary of Young's modulus picking parameters
+    :param decimate: dictionary of decimation parameters (see plot_elongation)
+    :param collection: draw all of the curves as a single LineCollection (much faster for many curves)
+    :param legend_limit: maximum number of curves to include in the legend (only used for collection)
     :return: figure and axes
     """
+    if collection:
+        return plot_elongations_collection(
+            elongs, ax, style,
+            markers=markers, linestyles=linestyles, colors=colors,
+            peaks=peaks, youngs_modulus=youngs_modulus, decimate=decimate,
+            legend_limit=legend_limit,
+        )
+
     colors = cycle_values(colors)
     markers = cycle_values(markers)
     linestyles = cycle_values(linestyles)
@@ -84,18 +113,100 @@ def plot_elongations(
         plot_elongation(
             elong, ax, style,
             marker=marker, linestyle=linestyle, color=color,
-            peaks=peaks, youngs_modulus=youngs_modulus
+            peaks=peaks, youngs_modulus=youngs_modulus, decimate=decimate
         )
 
 
+@profiled('plot', points=lambda lines, elongs, *args, **kwargs: sum(len(elong.xs) for elong in elongs))
+def plot_elongations_collection(
+    elongs, ax, style='stress/strain',
+    markers=None, linestyles=None, colors=None,
+    peaks=False, youngs_modulus=False, decimate=False,
+    legend_limit=20,
+):
+    """
+    Plot Elongations on an axis as a single LineCollection.
+
+    Peak and Young's modulus markers are each drawn as a single scatter, and the legend
+    uses proxy artists for (at most legend_limit of) the curves.
+
+    :param elongs: the Elongations to be plotted
+    :param ax: the axis on which to plot
+    :param style: the plot style
+    :param markers: the markers to use at each point on the plot (one scatter per marker)
+    :param linestyles: the styles of line to use
+    :param colors: the colors to use (None uses the axis color cycle)
+    :param peaks: dictionary of peak picking parameters
+    :param youngs_modulus: dictionary of Young's modulus picking parameters
+    :param decimate: dictionary of decimation parameters (see plot_elongation)
+    :param legend_limit: maximum number of curves to include in the legend
+    :return: LineCollection of the curves
+    """
+    # take the default colors from the axis color cycle, as ax.plot() does
+    colors = [ax._get_lines.get_next_color() if c is None else c for c, _ in zip(cycle_values(colors), elongs)]
+    linestyles = ['solid' if ls is None else ls for ls, _ in zip(cycle_values(linestyles), elongs)]
+    markers = [m for m, _ in zip(cycle_values(markers), elongs)]
+
+    curves = [np.column_stack(_decimated(elong, ax, decimate)) for elong in elongs]
+    lines = LineCollection(curves, colors=colors, linestyles=linestyles)
+    ax.add_collection(lines)
+    ax.autoscale_view()
+
+    for marker in set(markers) - {None}:
+        points = np.concatenate([curve for curve, m in zip(curves, markers) if m == marker])
+        point_colors = np.concatenate([[c]*len(curve) for curve, c, m in zip(curves, colors, markers) if m == marker])
+        ax.scatter(*points.T, c=point_colors, marker=marker)
+
+    if peaks:
+        xs, ys, peak_colors = [], [], []
+        for elong, color in zip(elongs, colors):
+            options = _peak_options(peaks, color)
+            peak_xs, peak_ys = annotate_peaks(elong, ax, options)
+            if options['marker']:
+                xs.extend(peak_xs)
+                ys.extend(peak_ys)
+                peak_colors.extend([options['color']]*len(peak_xs))
+        if xs:
+            ax.scatter(xs, ys, c=peak_colors, marker=_peak_options(peaks, None)['marker'])
+
+    if youngs_modulus:
+        xs, ys, modulus_colors, tangents, tangent_colors = [], [], [], [], []
+        for elong, color in zip(elongs, colors):
+            options = _youngs_modulus_options(youngs_modulus, color)
+            x, y, ym = annotate_youngs_modulus(elong, ax, options)
+            if options['marker']:
+                xs.append(x)
+                ys.append(y)
+                modulus_colors.append(options['color'])
+            if options['tangent']:
+                tangents.append(_tangent(x, y, ym))
+                tangent_colors.append(options['color'])
+        if xs:
+            ax.scatter(xs, ys, c=modulus_colors, marker=_youngs_modulus_options(youngs_modulus, None)['marker'])
+        if tangents:
+            ax.add_collection(LineCollection(tangents, colors=tangent_colors))
+
+    # proxy artists for the legend (empty lines do not affect the axis limits)
+    labeled = [(elong, c, ls) for elong, c, ls in zip(elongs, colors, linestyles) if elong.name is not None]
+    for elong, color, linestyle in labeled[:legend_limit]:
+        ax.add_line(Line2D([], [], color=color, linestyle=linestyle, label=elong.name))
+    if len(labeled) > legend_limit:
+        ax.add_line(Line2D([], [], linestyle='none', label=f'... {len(labeled) - legend_limit} more'))
+
+    return lines
+
+
+@profiled('plot', points=lambda result, elong, *args, **kwargs: len(elong.xs))
 def plot_elongation(
     elong, ax, style='stress/strain',
     marker=None, linestyle=None, color=None,
-    peaks=False, youngs_modulus=False
+    peaks=False, youngs_modulus=False, decimate=False
 ):
     """
     Plot an Elongation on an axis
 
+    Peaks and the Young's modulus are always determined from the full data.
+
     :param elong: the Elongation to be plotted
     :param ax: the axis on which to plot
     :param style: the plot style
@@ -104,64 +215,254 @@ def plot_elongation(
     :param color: the color to use
     :param peaks: dictionary of peak picking parameters
     :param youngs_modulus: dictionary of Young's modulus picking parameters
+    :param decimate: dictionary of decimation parameters for the plotted line
+        points: number of points to keep, if None, twice the width of the axis in pixels
+        method: 'minmax' (keeps the min and max in each bin) or 'lttb' (see tools.decimate_curve)
     """
     ax.plot(
-        elong.xs, elong.ys,
+        *_decimated(elong, ax, decimate),
         label=elong.name,
         marker=marker, linestyle=linestyle, color=color
     )
 
     if peaks:
-        peak_defaults = {
-            'color': color,
-            'format': '3.0f',
-            'labels': True,
-            'marker': 'x',
-            'print': True,
-        }
-        peaks = peak_defaults if peaks is True else {**peak_defaults, **peaks}
-        peak_indices, _ = elong.peak_indices()
-        peak_xs, peak_ys = elong.xs[peak_indices], elong.ys[peak_indices]
+        peaks = _peak_options(peaks, color)
+        peak_xs, peak_ys = annotate_peaks(elong, ax, peaks)
 
         if peaks['marker']:
             ax.scatter(peak_xs, peak_ys, color=peaks['color'], marker=peaks['marker'])
 
-        if peaks['labels']:
-            for x, y in zip(peak_xs, peak_ys):
-                ax.text(x, y, f'{{:{peaks["format"]}}}'.format(x), verticalalignment='bottom')
-
-        if peaks['print']:
-            print('Peaks')
-            print('   X       Y')
-            for x, y in zip(peak_xs, peak_ys):
-                print(f'{x:>6.1f} {y:>6.1f}')
-
     if youngs_modulus:
-        youngs_modulus_def = {
-            'color': color,
-            'format': '4.1f',
-            'labels': True,
-            'tangent': True,
-            'marker': 'x',
-            'print': True,
-        }
-        youngs_modulus = youngs_modulus_def if youngs_modulus is True else {**youngs_modulus_def, **youngs_modulus}
-        idx = np.nanargmax(elong.youngs_modulus_array)
-        x, y, ym = elong.xs[idx], elong.ys[idx], elong.youngs_modulus_array[idx]
+        youngs_modulus = _youngs_modulus_options(youngs_modulus, color)
+        x, y, ym = annotate_youngs_modulus(elong, ax, youngs_modulus)
 
         if youngs_modulus['marker']:
             ax.scatter(x, y, color=youngs_modulus['color'], marker=youngs_modulus['marker'])
 
         if youngs_modulus['tangent']:
-            xs = [0, 2*x]
-            ys = [y - ym*x, y + ym*x]
-            ax.plot(xs, ys, color=youngs_modulus['color'])
+            ax.plot(*np.transpose(_tangent(x, y, ym)), color=youngs_modulus['color'])
+
+
+def _decimated(elong, ax, decimate):
+    """
+    Decimate an Elongation for plotting, see plot_elongation.
+
+    :return: xs, ys to plot
+    """
+    xs, ys = elong.xs, elong.ys
+    if decimate:
+        decimate_defaults = {
+            'points': None,
+            'method': 'minmax',
+        }
+        decimate = decimate_defaults if decimate is True else {**decimate_defaults, **decimate}
+        points = decimate['points'] or 2*int(ax.bbox.width)
+        idxs = decimate_curve(xs, ys, points, decimate['method'])
+        xs, ys = xs[idxs], ys[idxs]
+    return xs, ys
+
+
+def _peak_options(peaks, color):
+    """
+    :param peaks: True or dictionary of peak picking parameters
+    :param color: color of the Elongation
+    :return: dictionary of peak picking parameters, with defaults filled in
+    """
+    peak_defaults = {
+        'color': color,
+        'format': '3.0f',
+        'labels': True,
+        'marker': 'x',
+        'print': True,
+    }
+    return peak_defaults if peaks is True else {**peak_defaults, **peaks}
+
 
-        if youngs_modulus['labels']:
-            ax.text(x, y, f'{{:{youngs_modulus["format"]}}}'.format(x), verticalalignment='bottom')
+def _youngs_modulus_options(youngs_modulus, color):
+    """
+    :param youngs_modulus: True or dictionary of Young's modulus picking parameters
+    :param color: color of the Elongation
+    :return: dictionary of Young's modulus picking parameters, with defaults filled in
+    """
+    youngs_modulus_def = {
+        'color': color,
+        'format': '4.1f',
+        'labels': True,
+        'tangent': True,
+        'marker': 'x',
+        'print': True,
+    }
+    return youngs_modulus_def if youngs_modulus is True else {**youngs_modulus_def, **youngs_modulus}
+
+
+def annotate_peaks(elong, ax, peaks):
+    """
+    Find the peaks of an Elongation, label them on the axis and print them (as set in peaks).
 
-        if youngs_modulus['print']:
-            print(f'Modulus: {ym:5.1f} ({x:5.1f}, {y:5.1f})')
+    :param elong: the Elongation
+    :param ax: the axis on which to label the peaks
+    :param peaks: dictionary of peak picking parameters (see _peak_options)
+    :return: peak x-values, peak y-values
+    """
+    peak_indices, _ = elong.peak_indices()
+    peak_xs, peak_ys = elong.xs[peak_indices], elong.ys[peak_indices]
+
+    if peaks['labels']:
+        for x, y in zip(peak_xs, peak_ys):
+            ax.text(x, y, f'{{:{peaks["format"]}}}'.format(x), verticalalignment='bottom')
+
+    if peaks['print']:
+        print('Peaks')
+        print('   X       Y')
+        for x, y in zip(peak_xs, peak_ys):
+            print(f'{x:>6.1f} {y:>6.1f}')
+
+    return peak_xs, peak_ys
+
+
+def annotate_youngs_modulus(elong, ax, youngs_modulus):
+    """
+    Find the Young's modulus of an Elongation, label it on the axis and print it (as set in youngs_modulus).
+
+    :param elong: the Elongation
+    :param ax: the axis on which to label the Young's modulus
+    :param youngs_modulus: dictionary of Young's modulus picking parameters (see _youngs_modulus_options)
+    :return: x, y, and Young's modulus at the point of the max Young's modulus
+    """
+    idx = np.nanargmax(elong.youngs_modulus_array)
+    x, y, ym = elong.xs[idx], elong.ys[idx], elong.youngs_modulus_array[idx]
+
+    if youngs_modulus['labels']:
+        ax.text(x, y, f'{{:{youngs_modulus["format"]}}}'.format(x), verticalalignment='bottom')
+
+    if youngs_modulus['print']:
+        print(f'Modulus: {ym:5.1f} ({x:5.1f}, {y:5.1f})')
+
+    return x, y, ym
+
+
+def _tangent(x, y, ym):
+    """
+    :return: end points of the tangent with slope ym at (x, y)
+    """
+    return [(0, y - ym*x), (2*x, y + ym*x)]
+
+
+def plot_report(
+    elongs, file_name, style='stress/strain',
+    rows=1, cols=1, panel_size=(6.4, 4.8), dpi=100,
+    peaks=True, youngs_modulus=True, decimate=False,
+    n_jobs=1,
+):
+    """
+    Render a report with a panel for each Elongation, showing its peaks and Young's modulus.
+
+    Pages of rows x cols panels are rendered headlessly (Agg) in parallel. If file_name
+    ends in .pdf, the (rasterized) pages are collated into a multi-page PDF, otherwise
+    each page is saved as an image, numbered as `{base_name}-{page}.{extension}` if there
+    are several pages.
+
+    :param elongs: the Elongations to be plotted (named panels are titled with their name)
+    :param file_name: where to save the report
+    :param style: the plot style
+    :param rows: number of rows of panels on each page
+    :param cols: number of columns of panels on each page
+    :param panel_size: size of each panel (in inches)
+    :param dpi: resolution of the pages
+    :param peaks: dictionary of peak picking parameters (see plot_elongation), not printed by default
+    :param youngs_modulus: dictionary of Young's modulus picking parameters, not printed by default
+    :param decimate: dictionary of decimation parameters (see plot_elongation)
+    :param n_jobs: number of processes to render with (None for all cores)
+    :return: names of the written files
+    """
+    elongs = list(elongs)
+    per_page = rows*cols
+    pages = [elongs[i:i + per_page] for i in range(0, len(elongs), per_page)]
+
+    pdf = file_name.split('.')[-1] == 'pdf'
+    if pdf:
+        page_names = [None]*len(pages)
+    else:
+        base_name, extension = file_name.rsplit('.', 1)
+        page_names = [
+            f'{base_name}-{i}.{extension}' if len(pages) > 1 else file_name for i in range(1, len(pages) + 1)
+        ]
+
+    render = partial(
+        render_page,
+        style=style, rows=rows, cols=cols, panel_size=panel_size, dpi=dpi,
+        peaks=peaks and {'print': False, **({} if peaks is True else peaks)},
+        youngs_modulus=youngs_modulus and {'print': False, **({} if youngs_modulus is True else youngs_modulus)},
+        decimate=decimate,
+    )
+
+    if n_jobs == 1 or len(pages) <= 1:
+        results = map(render, pages, page_names)
+        return _collate_report(results, file_name, page_names, dpi, pdf)
+
+    with ProcessPoolExecutor(n_jobs) as executor:
+        futures = (executor.submit(render, page, page_name) for page, page_name in zip(pages, page_names))
+        results = (future.result() for future in prefetched(futures, 2*(os.cpu_count() or 1)))
+        return _collate_report(results, file_name, page_names, dpi, pdf)
+
+
+def _collate_report(results, file_name, page_names, dpi, pdf):
+    """
+    Collate rendered pages, see plot_report().
+
+    :param results: rendered pages (RGBA arrays if pdf, else names of the saved pages)
+    :return: names of the written files
+    """
+    if not pdf:
+        return list(results)
+
+    with PdfPages(file_name) as pages:
+        for image in results:
+            height, width, _ = image.shape
+            fig = Figure(figsize=(width/dpi, height/dpi), dpi=dpi)
+            fig.figimage(image)
+            pages.savefig(fig)
+    return [file_name]
+
+
+def render_page(
+    elongs, file_name=None, style='stress/strain',
+    rows=1, cols=1, panel_size=(6.4, 4.8), dpi=100,
+    peaks=True, youngs_modulus=True, decimate=False,
+):
+    """
+    Render a page of panels headlessly (Agg), one for each Elongation.
+
+    :param elongs: the Elongations to be plotted (at most rows x cols)
+    :param file_name: where to save the page, if None, return the page as an array
+    :param style: the plot style
+    :param rows: number of rows of panels
+    :param cols: number of columns of panels
+    :param panel_size: size of each panel (in inches)
+    :param dpi: resolution of the page
+    :param peaks: dictionary of peak picking parameters (see plot_elongation)
+    :param youngs_modulus: dictionary of Young's modulus picking parameters
+    :param decimate: dictionary of decimation parameters (see plot_elongation)
+    :return: file_name if given, else RGBA array of the page
+    """
+    fig = Figure(figsize=(cols*panel_size[0], rows*panel_size[1]), dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    axes = fig.subplots(rows, cols, squeeze=False).flatten()
+
+    for elong, ax in zip(elongs, axes):
+        setup_axis(ax, style, elong.name)
+        plot_elongation(elong, ax, style, peaks=peaks, youngs_modulus=youngs_modulus, decimate=decimate)
+    for ax in axes[len(elongs):]:
+        ax.axis('off')
+    fig.tight_layout()
+
+    with profile_stage('render'):
+        if file_name is not None:
+            fig.savefig(file_name)
+            return file_name
+
+        canvas.draw()
+        return np.asarray(canvas.buffer_rgba()).copy()
 
 
 def setup_axis(
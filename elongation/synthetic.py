@@ -0,0 +1,199 @@
+import numpy as np
+
+from .elongation import Elongation, write_csv
+
+
+# resolution of the load cell (in Newtons), as in MT2500 files
+LOAD_RESOLUTION = 0.0445
+
+
+def synthetic_curve(points=1000, rng=None):
+    """
+    Generate a realistic stress/strain curve, as recorded by an MT2500.
+
+    The curve has slack at the start, an elastic rise to a yield peak, a drawing plateau
+    with strain hardening, and a break followed by a few points of noise. The test lasts
+    between 10 and 20 minutes, whatever the number of points, which are sampled across
+    it with jitter. The loads are quantized to the resolution of the load cell.
+
+    :param points: number of points (times are recorded to 0.1 ms, so they remain strictly
+        increasing up to about 4 million points)
+    :param rng: numpy Generator or seed
+    :return: times (in seconds), loads (in Newtons)
+    """
+    rng = np.random.default_rng(rng)
+
+    duration = rng.uniform(600, 1200)
+    steps = rng.uniform(0.7, 1.3, points)
+    times = np.round(np.cumsum(steps)*duration/np.sum(steps), 4)
+
+    slack = rng.uniform(0.005, 0.02)*duration
+    yield_time = slack + rng.uniform(0.03, 0.08)*duration
+    break_time = rng.uniform(0.9, 0.98)*duration
+    yield_load = rng.uniform(5, 40)
+    hardening = rng.uniform(0, 1)*yield_load/duration
+
+    strain = np.clip(times - slack, 0, None)
+    loads = 0.85*yield_load*np.tanh(2*strain/(yield_time - slack))
+    # yield peak followed by necking
+    loads += 0.15*yield_load*np.exp(-((times - yield_time)/(0.02*duration))**2)
+    loads += hardening*np.clip(times - yield_time, 0, None)
+    loads += rng.normal(0, 0.002*yield_load, points)
+    loads[times > break_time] = rng.normal(-1.2, 0.05, np.sum(times > break_time))
+
+    return times, np.round(np.round(loads/LOAD_RESOLUTION)*LOAD_RESOLUTION, 4)
+
+
+def synthetic_tests(tests=1, points=1000, seed=0):
+    """
+    Generate the data and results of synthetic MT2500 tests.
+
+    :param tests: number of tests
+    :param points: number of points in each test
+    :param seed: seed for the random number generator
+    :yield: data (with times and loads as 'xs' and 'ys'), results
+    """
+    rng = np.random.default_rng(seed)
+    for _ in range(tests):
+        times, loads = synthetic_curve(points, rng)
+        # the crosshead speed is chosen so that the test ends at 200-1300% strain
+        speed = round(rng.uniform(2, 13)*60.0/times[-1], 3)
+        thickness = round(rng.uniform(0.5, 10), 3)
+        width = round(rng.uniform(5, 10), 3)
+        break_i = np.flatnonzero(loads > 0)[-1]
+        yield_i = np.argmax(loads[:len(loads)//4])
+
+        data = {
+            'Crosshead_speed': speed,
+            'X_unit': 'Secs.',
+            'Y_unit': 'Newtons',
+            'Sample_Thkness': thickness,
+            'Sample_Width': width,
+            'Grip_Separation': 60.0,
+            'Start_Threshhold': 0.1,
+            'Stop_Threshhold': 0.1,
+            'xs': times,
+            'ys': loads,
+        }
+        results = {
+            'BreakLoad': loads[break_i],
+            'BreakStrength': loads[break_i]/(thickness*width)*1e3,
+            'BreakElongation': times[break_i]*data['Crosshead_speed'],
+            'BreakPctElongation': times[break_i]*data['Crosshead_speed']/60.0*100,
+            'YieldStrength1': loads[yield_i]/(thickness*width)*1e3,
+            'YieldLoad1': loads[yield_i],
+        }
+        yield data, results
+
+
+def synthetic_elongations(tests=1, points=1000, seed=0):
+    """
+    Generate synthetic Elongations, identical to reading the file of write_synthetic_prn().
+
+    :param tests: number of tests
+    :param points: number of points in each test
+    :param seed: seed for the random number generator
+    :return: list of Elongation objects
+    """
+    return [
+        Elongation(
+            data['xs']*data['Crosshead_speed'], data['ys'],
+            data['Grip_Separation']/1e3, data['Sample_Width']/1e3, data['Sample_Thkness']/1e3,
+        )
+        for data, _ in synthetic_tests(tests, points, seed)
+    ]
+
+
+def write_synthetic_prn(file_name, tests=1, points=1000, seed=0):
+    """
+    Write a synthetic MT2500 prn file (see read_prn() for the format).
+
+    :param file_name: name of the file
+    :param tests: number of tests
+    :param points: number of points in each test
+    :param seed: seed for the random number generator
+    """
+    tests = list(synthetic_tests(tests, points, seed))
+    with open(file_name, 'w', newline='\r\n') as f:
+        f.write('prn:13|\nsubtype = MT2500\nDoc={MT2500:14|\n')
+        f.write('''  Film={12.1|
+    Test_Mode = tensile
+    Setup_Name = -
+    Unit_System = SI
+    Graph_Mode = stress/strain
+    Sample_Length = 60.00
+    CrossheadVlcty = 540
+    VelocityUnitId = 1
+    CrossheadSpeed = 21.2598
+    Loadcell_Mode = Tension
+    Loadcell_Type = "SM Series"
+    Start_Threshold = 0.10
+    Stop_Threshold = 0.10
+    Auto_Stop = True
+    Auto_Return = True
+    ExtnsnResetOnStart = False
+    Yield_Type = 0
+    COF_Sled_Load = 200.00
+    }
+  Test_Info={2|
+    Color = -
+    Order_Id = -
+    Technician = -
+    Test_Method = -
+    Sample_Conditioning = -
+    Test_Conditions = -
+    Product_Name = synthetic
+    Test_Direction = up
+    }
+''')
+
+        f.write('  Test_Data=(\n')
+        for i, (data, _) in enumerate(tests):
+            f.write('    {6|\n')
+            f.write(f'''      Crosshead_speed = {data["Crosshead_speed"]:.3f}
+      X_unit = {data["X_unit"]}
+      Y_unit = {data["Y_unit"]}
+      Sample_Thkness = {data["Sample_Thkness"]:.3f}
+      Sample_Width = {data["Sample_Width"]:.3f}
+      Grip_Separation = {data["Grip_Separation"]:.3f}
+      Start_Threshhold = {data["Start_Threshhold"]:.3f}
+      Stop_Threshhold = {data["Stop_Threshhold"]:.3f}
+      Number_Of_Points = {len(data["xs"])}
+      Points = [
+''')
+            values = np.column_stack((data['xs'], data['ys'])).ravel()
+            f.write(('%12.4f,%9.4f\n'*len(data['xs'])) % tuple(values))
+            f.write('         ]\n')
+            f.write('      },\n' if i < len(tests) - 1 else '      }\n')
+        f.write('    )\n')
+
+        f.write('  Test_Results=(\n')
+        for i, (_, results) in enumerate(tests):
+            f.write('    {6|\n')
+            f.write('''      TestDate = 21 Aug, 2019
+      Length_Cnvrsn = 1.000000
+      Force_Cnvrsn = 1.000000
+      LoadCell_Capacity = 100
+      LoadCell_CpctyUnit = 1
+      LoadCell_BitsOfReso = 14
+      Analysis={ATensile:1|
+        Slack_time = 0.000000
+        SampleThickness = 1.0000
+''')
+            for key, value in results.items():
+                f.write(f'        {key} = {value:.4f}\n')
+            f.write('        }\n')
+            f.write('      },\n' if i < len(tests) - 1 else '      }\n')
+        f.write('    )\n  }\n')
+
+
+def write_synthetic_csv(file_name, points=1000, seed=0):
+    """
+    Write a synthetic csv file (of a single test, see write_csv()).
+
+    :param file_name: name of the file
+    :param points: number of points
+    :param seed: seed for the random number generator
+    """
+    elong, = synthetic_elongations(1, points, seed)
+    write_csv(elong, file_name)
@@ -1,26 +1,401 @@
 import numpy as np
 
-import more_itertools as mit
+import collections
+import contextlib
+import cProfile
+import functools
+import hashlib
+import itertools
+import os
+import time
+import tracemalloc
+import warnings
 
+from concurrent.futures import ProcessPoolExecutor
 
-class MyIter(mit.peekable):
+
+# wall time, calls and points of each profiled stage, None if profiling is disabled
+_profile = None
+
+
+def enable_profiling(enabled=True):
+    """
+    Enable (or disable) recording of the profiled stages (see profiled()).
+
+    Disabled by default, in which case profiled stages cost a single check. Only stages
+    run in the current process are recorded (not those run by map_files() workers).
+
+    :param enabled: if False, disable profiling (and discard the recorded stages)
+    """
+    global _profile
+    if not enabled:
+        _profile = None
+    elif _profile is None:
+        _profile = {}
+
+
+def reset_profile():
+    """
+    Discard the recorded stages.
+    """
+    if _profile is not None:
+        _profile.clear()
+
+
+def profile_stats():
+    """
+    Statistics of the recorded stages.
+
+    Times are inclusive, a stage run within another counts towards both.
+
+    :return: dictionary of stage: {'time': wall time (in seconds), 'calls': count, 'points': points processed}
+    """
+    return {
+        stage: {'time': seconds, 'calls': calls, 'points': points}
+        for stage, (seconds, calls, points) in (_profile or {}).items()
+    }
+
+
+def format_profile():
+    """
+    :return: table of the recorded stages, slowest first
+    """
+    lines = [f'{"Stage":<16} {"Time (s)":>10} {"Calls":>8} {"Points":>12} {"Points/s":>12}', '-'*62]
+    for stage, stats in sorted(profile_stats().items(), key=lambda item: -item[1]['time']):
+        rate = f'{stats["points"]/stats["time"]:12.0f}' if stats['points'] and stats['time'] else f'{"-":>12}'
+        lines.append(f'{stage:<16} {stats["time"]:10.4f} {stats["calls"]:8d} {stats["points"]:12d} {rate}')
+    return '\n'.join(lines)
+
+
+def _record(stage, seconds, points):
+    """
+    Add a run of a stage to the profile (if still enabled).
+    """
+    if _profile is not None:
+        record = _profile.setdefault(stage, [0.0, 0, 0])
+        record[0] += seconds
+        record[1] += 1
+        record[2] += points
+
+
+def profiled(stage, points=None):
+    """
+    Decorator recording the wall time, calls, and points processed of a function as a stage.
+
+    :param stage: name of the stage
+    :param points: function of the result and the arguments, returning the number of points processed
+    :return: decorator
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _profile is None:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            seconds = time.perf_counter() - start
+            _record(stage, seconds, 0 if points is None else int(points(result, *args, **kwargs)))
+            return result
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def profile_stage(stage, points=0):
+    """
+    Context manager recording the wall time of a block as a stage, see profiled().
+
+    :param stage: name of the stage
+    :param points: number of points processed
+    """
+    if _profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(stage, time.perf_counter() - start, points)
+
+
+# sentinel for MyIter.peek()
+_marker = object()
+
+
+class MyIter:
     """
     Simple class for making it easier to debug the parsing of files.
 
-    Extends more-itertools.peekable:
+    A minimal peekable iterator (as more-itertools.peekable):
+        _it: the underlying iterator
+        _cache: peeked (but not yet consumed) items
         _index: index of currently read line
         _line: currently read line
     """
     def __init__(self, iterable):
+        self._it = iter(iterable)
+        self._cache = collections.deque()
         self._index = 0
         self._line = None
-        super().__init__(iterable)
+
+    def __iter__(self):
+        return self
+
+    def __bool__(self):
+        try:
+            self.peek()
+        except StopIteration:
+            return False
+        return True
 
     def __next__(self):
-        self._line = super().__next__()
+        self._line = self._cache.popleft() if self._cache else next(self._it)
         self._index += 1
         return self._line
 
+    def peek(self, default=_marker):
+        """
+        Return the next item without consuming it.
+
+        :param default: returned if the iterable is exhausted (otherwise StopIteration is raised)
+        :return: next item
+        """
+        if not self._cache:
+            try:
+                self._cache.append(next(self._it))
+            except StopIteration:
+                if default is _marker:
+                    raise
+                return default
+        return self._cache[0]
+
+    def prepend(self, *items):
+        """
+        Push items onto the front of the iterable, to be consumed next.
+
+        :param items: items to prepend
+        """
+        self._cache.extendleft(reversed(items))
+
+    @profiled('read_lines', points=lambda lines, self, n: len(lines))
+    def take(self, n):
+        """
+        Consume the next n lines at once.
+
+        Bypasses the per-line bookkeeping of __next__, for use on large blocks.
+
+        :param n: number of lines to take
+        :return: list of lines (shorter than n if the iterable is exhausted)
+        """
+        lines = [self._cache.popleft() for _ in range(min(n, len(self._cache)))]
+        lines += itertools.islice(self._it, n - len(lines))
+        self._index += len(lines)
+        if lines:
+            self._line = lines[-1]
+        return lines
+
+    def take_points(self, n, columns=2, separator=',', chunk_size=2**14):
+        """
+        Consume the next n lines, each holding `columns` numbers, as an array.
+
+        The lines are converted in chunks (see read_points()) into a preallocated array,
+        so that only a chunk of the text is held in memory at once.
+
+        :param n: number of lines to take
+        :param columns: number of numbers per line
+        :param separator: separator between numbers on a line
+        :param chunk_size: number of lines to convert at once
+        :return: array of shape (n, columns)
+        """
+        points = np.empty((n, columns))
+        for start in range(0, n, chunk_size):
+            lines = self.take(min(chunk_size, n - start))
+            assert len(lines) == min(chunk_size, n - start), 'Not enough lines.'
+            points[start:start + len(lines)] = self.convert_points(''.join(lines), columns, separator)
+        return points
+
+    def convert_points(self, text, columns=2, separator=','):
+        """
+        Convert text just consumed from the iterable with read_points().
+
+        If the conversion fails, _index and _line are moved to the offending line.
+
+        :param text: lines of text, each holding `columns` numbers
+        :param columns: number of numbers per line
+        :param separator: separator between numbers on a line
+        :return: array of shape (number of lines, columns)
+        """
+        try:
+            return read_points(text, columns, separator)
+        except (AssertionError, ValueError):
+            self._index -= text.count('\n')
+            for line in text.splitlines(keepends=True):
+                self._index += 1
+                self._line = line
+                read_points(line, columns, separator)
+            raise
+
+    def read_chunks(self, size=2**20):
+        """
+        Consume the remainder of the iterable as chunks of whole lines.
+
+        Reads directly from the underlying file if possible, `size` characters (and the
+        rest of the line) at a time.
+
+        :param size: approximate number of characters in each chunk
+        :yield: chunks of text
+        """
+        text = ''.join(self._cache)
+        self._cache.clear()
+        if text:
+            self._index += text.count('\n')
+            yield text
+
+        if not hasattr(self._it, 'read'):
+            text = ''.join(self._it)
+            self._index += text.count('\n')
+            if text:
+                yield text
+            return
+
+        while True:
+            with profile_stage('read_lines'):
+                text = self._it.read(size)
+                text += self._it.readline() if text else ''
+            if not text:
+                return
+            self._index += text.count('\n')
+            yield text
+
+
+@contextlib.contextmanager
+def profiling(stages=True, cprofile=None):
+    """
+    Profile a block, recording its stages (see enable_profiling()) and optionally running cProfile.
+
+    :param stages: record the profiled stages (read them with profile_stats() or format_profile())
+    :param cprofile: file to which to dump the cProfile statistics (e.g. for pstats or snakeviz),
+        if None, cProfile is not run
+
+    On exit, profiling is restored to its previous state, so read the stages within the block.
+    """
+    global _profile
+    previous = _profile
+    if stages:
+        enable_profiling()
+    profiler = cProfile.Profile() if cprofile else None
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(cprofile)
+        _profile = previous
+
+
+def peak_memory(function, *args, **kwargs):
+    """
+    Measure the peak memory allocated while calling a function, with tracemalloc.
+
+    Only allocations made through Python's allocators (including numpy arrays) are traced,
+    memory-mapped files are not.
+
+    :param function: function to call
+    :param *args, **kwargs: arguments for the function
+    :return: result of the function, peak memory allocated above that in use beforehand (in bytes)
+    """
+    tracing = tracemalloc.is_tracing()
+    if tracing and hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    else:
+        # before Python 3.9, the peak can only be reset by restarting the tracing
+        tracemalloc.stop()
+        tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        result = function(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return result, peak - before
+
+
+def file_hash(file_name, chunk_size=2**20):
+    """
+    Hash the contents of a file.
+
+    :param file_name: name of the file
+    :param chunk_size: number of bytes to read at a time
+    :return: sha256 hex digest
+    """
+    sha256 = hashlib.sha256()
+    with open(file_name, 'rb') as f:
+        for chunk in iter(functools.partial(f.read, chunk_size), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def map_files(function, file_names, n_jobs=1, executor=None, errors='raise', prefetch=None):
+    """
+    Apply a function to each of a set of files, optionally in parallel.
+
+    Results are yielded in the same order as the files. When run in parallel, at most
+    `prefetch` files are processed ahead of the result being yielded, bounding memory use.
+
+    :param function: function that takes a file name (must be picklable if run in parallel)
+    :param file_names: names of the files
+    :param n_jobs: number of processes to use (None for all cores), ignored if an executor is given
+    :param executor: concurrent.futures.Executor on which to run the function
+    :param errors: if 'raise', the first failure is raised, if 'warn', failures are
+        reported with a warning and the file is skipped
+    :param prefetch: number of files to process ahead (None for twice the number of cores)
+    :yield: file name, result
+    """
+    if errors not in ('raise', 'warn'):
+        raise ValueError(f'Invalid value for errors: {errors}')
+
+    file_names = list(file_names)
+    if executor is None and n_jobs != 1 and len(file_names) > 1:
+        with ProcessPoolExecutor(n_jobs) as executor:
+            yield from map_files(function, file_names, executor=executor, errors=errors, prefetch=prefetch)
+        return
+
+    if executor is None:
+        results = (functools.partial(function, file_name) for file_name in file_names)
+    else:
+        prefetch = 2*(os.cpu_count() or 1) if prefetch is None else prefetch
+        futures = (executor.submit(function, file_name) for file_name in file_names)
+        results = (future.result for future in prefetched(futures, prefetch))
+
+    for file_name, result in zip(file_names, results):
+        try:
+            value = result()
+        except Exception as e:
+            if errors == 'raise':
+                raise
+            warnings.warn(f'Unable to process {file_name}: {e!r}')
+            continue
+        yield file_name, value
+
+
+def prefetched(iterable, depth):
+    """
+    Iterate while keeping a number of items pulled from the iterable ahead of the one yielded.
+
+    :param iterable: iterable to pull items from
+    :param depth: number of items to pull ahead
+    :yield: items of the iterable
+    """
+    iterator = iter(iterable)
+    buffer = collections.deque(itertools.islice(iterator, depth))
+    while buffer:
+        item = buffer.popleft()
+        buffer.extend(itertools.islice(iterator, 1))
+        yield item
+
 
 def read_key_value(line, separator='='):
     """
@@ -34,6 +409,260 @@ def read_key_value(line, separator='='):
     return key.strip(), value.strip()
 
 
+@profiled('convert', points=lambda points, *args, **kwargs: len(points))
+def read_points(text, columns=2, separator=','):
+    """
+    Convert text of delimited numbers to an array with a single bulk conversion.
+
+    :param text: lines of text, each holding `columns` numbers
+    :param columns: number of numbers per line
+    :param separator: separator between numbers on a line
+    :return: array of shape (number of lines, columns)
+    """
+    text = text.strip()
+    rows = text.count('\n') + 1 if text else 0
+    with warnings.catch_warnings():
+        # NumPy < 2 stops at unparsable text with only a DeprecationWarning
+        warnings.simplefilter('error', DeprecationWarning)
+        try:
+            values = np.fromstring(text.replace('\n', separator), sep=separator)
+        except DeprecationWarning as e:
+            raise ValueError('Could not read all points.') from e
+    assert len(values) == rows*columns, 'Could not read all points.'
+    return values.reshape(-1, columns)
+
+
+def first_true(mask, default=None):
+    """
+    Find the index of the first True value.
+
+    :param mask: boolean array
+    :param default: value to return if there are no True values
+    :return: index of first True value
+    """
+    if not len(mask):
+        return default
+    i = np.argmax(mask)
+    return int(i) if mask[i] else default
+
+
+def segment_first_true(mask, starts, ends):
+    """
+    Find the index of the first True value in each segment of an array.
+
+    :param mask: boolean array
+    :param starts: index at which each segment starts
+    :param ends: index at which each segment ends (exclusive)
+    :return: array of indices (into mask) of the first True value in each segment, -1 if none
+    """
+    true_is = np.append(np.flatnonzero(mask), len(mask))
+    firsts = true_is[np.searchsorted(true_is, starts)]
+    return np.where(firsts < ends, firsts, -1)
+
+
+def segment_smooth_curve(ys, offsets, box_pts=True, method='convolve', xs=None):
+    """
+    Smooth each segment of a concatenated set of curves.
+
+    Equivalent to calling smooth_curve() on each segment. The 'convolve' and 'mean' methods
+    are computed for all segments at once with cumulative sums, NaNs propagate to the points
+    whose box includes them.
+
+    :param ys: concatenated points to smooth
+    :param offsets: index at which each segment starts, followed by the total length
+    :param box_pts: number of data points to convolve, if True, use 3 (no longer than the segments)
+    :param method: smoothing method (see smooth_curve)
+    :param xs: concatenated x-values (only needed for the 'x' method)
+    :return: smoothed points
+    """
+    if box_pts is True:
+        box_pts = 3
+
+    offsets = np.asarray(offsets)
+    if method not in ('convolve', 'mean'):
+        return np.concatenate([
+            smooth_curve(ys[start:end], box_pts, method, None if xs is None else xs[start:end])
+            for start, end in zip(offsets[:-1], offsets[1:])
+        ] or [[]])
+
+    lengths = np.diff(offsets)
+    seg_starts = np.repeat(offsets[:-1], lengths)
+    seg_ends = np.repeat(offsets[1:], lengths)
+
+    # bounds of the box around each point (as in np.convolve(mode='same')), clipped to its segment
+    idxs = np.arange(len(ys))
+    his = np.clip(idxs + (box_pts - 1)//2 + 1, seg_starts, seg_ends)
+    los = np.clip(idxs + (box_pts - 1)//2 + 1 - box_pts, seg_starts, seg_ends)
+
+    return _window_means(ys, los, his, box_pts if method == 'convolve' else None)
+
+
+def _window_means(ys, los, his, size=None):
+    """
+    Average windows of points with cumulative sums, NaNs propagate to the windows including them.
+
+    :param ys: points
+    :param los: index at which each window starts
+    :param his: index at which each window ends (exclusive)
+    :param size: number of points to divide each sum by, if None, the number in the window
+    :return: mean of each window
+    """
+    nans = np.isnan(ys)
+    sums = np.concatenate(([0], np.cumsum(np.where(nans, 0, ys))))
+    nan_counts = np.concatenate(([0], np.cumsum(nans)))
+
+    means = (sums[his] - sums[los]) / (his - los if size is None else size)
+    means[nan_counts[his] > nan_counts[los]] = np.nan
+    return means
+
+
+def sliding_slopes(xs, ys, window, mask=None, width=None):
+    """
+    Fit a line to each window of points, in O(n) using cumulative sums (see window_slopes()).
+
+    :param xs: x-values
+    :param ys: y-values
+    :param window: number of points in each window (at least 2)
+    :param mask: boolean array of the points which may be used, windows including any
+        other point (or a NaN) are NaN
+    :param width: if given, each window instead holds the points within width (in x) of its
+        first point (xs must be sorted), windows with fewer than `window` points are NaN
+    :return: slope of the least-squares line through each window (starting at each of the
+        first len(xs) - window + 1 points)
+    """
+    if window < 2:
+        raise ValueError(f'Window must contain at least 2 points, got {window}.')
+    xs, ys = np.asarray(xs, dtype=float), np.asarray(ys, dtype=float)
+    if len(xs) < window:
+        return np.empty(0)
+
+    starts = np.arange(len(xs) - window + 1)
+    if width is None:
+        return window_slopes(xs, ys, starts, starts + window, mask)
+
+    if np.any(np.diff(xs) < 0):
+        raise ValueError('Windows of a width require sorted xs.')
+    ends = np.searchsorted(xs, xs[starts] + width, side='right')
+    slopes = window_slopes(xs, ys, starts, ends, mask)
+    slopes[ends - starts < window] = np.nan
+    return slopes
+
+
+def window_slopes(xs, ys, starts, ends, mask=None, block=2**12):
+    """
+    Fit a line to the points of each window, in O(n) using cumulative sums.
+
+    The sums are accumulated separately for each block of windows, with the data centered
+    on the block, so that the loss of precision from subtracting large cumulative sums
+    does not grow with the length of the data.
+
+    :param xs: x-values
+    :param ys: y-values
+    :param starts: (increasing) index of the first point of each window
+    :param ends: index after the last point of each window
+    :param mask: boolean array of the points which may be used, windows including any
+        other point (or a NaN) are NaN
+    :param block: number of windows per block
+    :return: slope of the least-squares line through each window, NaN for windows of fewer than 2 points
+    """
+    xs, ys = np.asarray(xs, dtype=float), np.asarray(ys, dtype=float)
+    starts, ends = np.asarray(starts), np.asarray(ends)
+    valid = np.isfinite(xs) & np.isfinite(ys)
+    if mask is not None:
+        valid &= mask
+
+    slopes = np.full(len(starts), np.nan)
+    for b in range(0, len(starts), block):
+        block_starts, block_ends = starts[b:b + block], ends[b:b + block]
+        lo, hi = block_starts[0], max(block_ends.max(), block_starts[0])
+        block_valid = valid[lo:hi]
+        if not block_valid.any():
+            continue
+        x = np.where(block_valid, xs[lo:hi] - xs[lo:hi][block_valid].mean(), 0)
+        y = np.where(block_valid, ys[lo:hi] - ys[lo:hi][block_valid].mean(), 0)
+
+        def window_sums(values):
+            sums = np.concatenate(([0], np.cumsum(values)))
+            return sums[block_ends - lo] - sums[block_starts - lo]
+
+        n = block_ends - block_starts
+        sx, sy = window_sums(x), window_sums(y)
+        sxx, sxy = window_sums(x*x), window_sums(x*y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            block_slopes = (n*sxy - sx*sy)/(n*sxx - sx*sx)
+        block_slopes[(window_sums(~block_valid) > 0) | (n < 2) | ~np.isfinite(block_slopes)] = np.nan
+        slopes[b:b + block] = block_slopes
+    return slopes
+
+
+def decimate_curve(xs, ys, points, method='minmax'):
+    """
+    Reduce the number of points in a curve while preserving its visual features.
+
+    minmax: split the curve into points/2 bins and keep the min and max of each bin,
+        preserving the envelope (including all peaks).
+    lttb: Largest-Triangle-Three-Buckets, keep the point in each bin that forms the
+        largest triangle with its neighbors.
+
+    :param xs: x-values of the curve
+    :param ys: y-values of the curve
+    :param points: (approximate) number of points to keep
+    :param method: decimation method, 'minmax' or 'lttb'
+    :return: indices of the points to keep
+    """
+    n = len(ys)
+    if n <= points or points < 3:
+        return np.arange(n)
+
+    if method == 'minmax':
+        return _decimate_minmax(ys, points)
+    elif method == 'lttb':
+        return _decimate_lttb(xs, ys, points)
+    raise ValueError(f'Invalid decimation method: {method}')
+
+
+def _decimate_minmax(ys, points):
+    """
+    :return: indices of the min and max of each bin (and the end points), see decimate_curve()
+    """
+    n = len(ys)
+    starts = np.linspace(0, n, points//2, endpoint=False).astype(int)
+    ends = np.append(starts[1:], n)
+    lengths = ends - starts
+
+    mins = np.fmin.reduceat(ys, starts)
+    maxs = np.fmax.reduceat(ys, starts)
+    min_is = segment_first_true(ys == np.repeat(mins, lengths), starts, ends)
+    max_is = segment_first_true(ys == np.repeat(maxs, lengths), starts, ends)
+
+    idxs = np.concatenate(([0, n - 1], min_is, max_is))
+    return np.unique(idxs[idxs >= 0])  # all-NaN bins are dropped
+
+
+def _decimate_lttb(xs, ys, points):
+    """
+    :return: indices selected by Largest-Triangle-Three-Buckets, see decimate_curve()
+    """
+    n = len(ys)
+    # the end points are kept, the rest are split into points - 2 buckets
+    edges = np.linspace(1, n - 1, points - 1).astype(int)
+
+    idxs = np.empty(points, dtype=int)
+    idxs[0], idxs[-1] = 0, n - 1
+    for b in range(points - 2):
+        start, end = edges[b], edges[b + 1]
+        next_end = edges[b + 2] if b + 2 < len(edges) else n
+        # average of the next bucket
+        next_x, next_y = xs[end:next_end].mean(), ys[end:next_end].mean()
+        prev_x, prev_y = xs[idxs[b]], ys[idxs[b]]
+        areas = np.abs(
+            (prev_x - next_x)*(ys[start:end] - prev_y) - (prev_x - xs[start:end])*(next_y - prev_y)
+        )
+        idxs[b + 1] = start + np.nanargmax(areas) if not np.isnan(areas).all() else start
+
+    return idxs
+
+
 def try_to_num(in_str):
     """
     Convert string to a number if possible.
@@ -74,19 +703,60 @@ def compare_dictionaries(dict1, dict2):
     return True
 
 
-def smooth_curve(ys, box_pts=True):
+def smooth_curve(ys, box_pts=True, method='convolve', xs=None):
     """
     Smooth a curve.
 
-    Assumes that the ys are uniformly distributed. Returns output of length
-    `max(ys, box_pts)`, boundary effects are visible.
+    Methods:
+        convolve: box convolution (np.convolve), assumes that the ys are uniformly distributed.
+            Returns output of length `max(ys, box_pts)`, boundary effects are visible.
+        mean: moving average with cumulative sums (cost independent of box_pts), the
+            boxes shrink at the edges rather than being padded with zeros
+        savgol: quadratic Savitzky-Golay filter (box_pts rounded up to odd), fit to the edges
+        x: moving average over an x-width of box_pts times the median x spacing, for
+            non-uniformly spaced points (xs must be sorted), the boxes shrink at the edges
 
     :param ys: points to smooth
     :param box_pts: number of data points to convolve, if True, use 3
+    :param method: smoothing method
+    :param xs: x-values of the points (only needed for the 'x' method)
     :return: smoothed points
     """
     if box_pts is True:
         box_pts = 3
 
-    box = np.ones(box_pts) / box_pts
-    return np.convolve(ys, box, mode='same')
+    if method == 'convolve':
+        box = np.ones(box_pts) / box_pts
+        return np.convolve(ys, box, mode='same')
+
+    ys = np.asarray(ys, dtype=float)
+    if method == 'mean':
+        idxs = np.arange(len(ys))
+        his = np.minimum(idxs + (box_pts - 1)//2 + 1, len(ys))
+        los = np.maximum(idxs + (box_pts - 1)//2 + 1 - box_pts, 0)
+        return _window_means(ys, los, his)
+
+    if method == 'savgol':
+        # the window must be odd, and no longer than the curve
+        window = min(box_pts | 1, len(ys) - (1 - len(ys) % 2))
+        if window < 3:
+            return ys.copy()
+        # polynomial fits at the edges fail with NaNs, so pad with the edge values instead
+        mode = 'interp' if np.isfinite(ys).all() else 'nearest'
+        from scipy import signal
+        return signal.savgol_filter(ys, window, 2, mode=mode)
+
+    if method == 'x':
+        if xs is None:
+            raise ValueError('The x method requires xs.')
+        xs = np.asarray(xs, dtype=float)
+        if len(xs) < 2:
+            return ys.copy()
+        if np.any(np.diff(xs) < 0):
+            raise ValueError('The x method requires sorted xs.')
+        half_width = box_pts*np.median(np.diff(xs))/2
+        los = np.searchsorted(xs, xs - half_width, side='left')
+        his = np.searchsorted(xs, xs + half_width, side='right')
+        return _window_means(ys, los, his)
+
+    raise ValueError(f'Invalid smoothing method: {method}')
@@ -1,9 +1,12 @@
+import os
 import sys
+import pickle
 import numpy as np
 
+from datetime import datetime
 from numpy.testing import assert_almost_equal as aae
 
-from pytest import raises
+from pytest import raises, warns
 
 sys.path.insert(0, '..')
 
@@ -15,6 +18,37 @@ def test_read():
     assert len(elongs) == 3
 
 
+def test_read_elongations(tmp_path):
+    file_names = ['tests/test_files/test1.prn', 'tests/test_files/test1.csv']
+    elongs = read_elongations(file_names)
+    assert len(elongs) == 4
+    assert read_elongations(file_names, n_jobs=2) == elongs
+
+    bad_file = f'{tmp_path}/bad.csv'
+    open(bad_file, 'w').write('Points\n%, N\n1, 2, 3\n')
+    with raises(AssertionError):
+        read_elongations([bad_file, *file_names])
+    with warns(UserWarning):
+        assert read_elongations([bad_file, *file_names], n_jobs=2, errors='warn') == elongs
+
+
+def test_iter_elongations():
+    file_names = ['tests/test_files/test1.prn', 'tests/test_files/test1.csv']
+    elongs = iter_elongations(file_names)
+    assert next(elongs) == read_prn(file_names[0])[0]
+    assert len(list(elongs)) == 3
+
+    assert list(iter_elongations(file_names*3, n_jobs=2, prefetch=1)) == read_elongations(file_names*3)
+
+
+def test_convert_elongation(tmp_path):
+    file_name = f'{tmp_path}/test1.prn'
+    open(file_name, 'w').write(open('tests/test_files/test1.prn').read())
+    new_names = convert_elongation(file_name)
+    assert new_names == [f'{tmp_path}/test1-{i}.csv' for i in range(1, 4)]
+    assert read_elongations(new_names)[1] == read_csv(new_names[1])[0]
+
+
 def test_read_prn():
     e0, e1, e2 = read_prn('tests/test_files/test1.prn')
 
@@ -37,13 +71,26 @@ def test_read_prn():
     assert len(e2.xs) == len(e2.ys)
 
 
-def test_read_csv(tmp_path):
+def test_read_csv(tmp_path, capsys):
     infile = 'tests/test_files/test1.csv'
     elong, *others = read_elongation(infile)
     assert len(others) == 0
 
+    assert len(elong.xs) == 2344
+    aae(elong.xs[:3], [0.18, 0.272, 0.411])
+    aae(elong.ys[-1], 0.0445)
+
     outfile = f'{tmp_path}/test1_write.csv'
     elong.write(outfile)
+    assert read_csv(outfile)[0] == elong
+
+    # rows with the wrong number of columns are reported at their line
+    lines = open(infile).readlines()
+    lines[40] = lines[40].rstrip() + ', 1.0\n'
+    open(f'{tmp_path}/bad.csv', 'w').writelines(lines)
+    with raises(AssertionError):
+        read_csv(f'{tmp_path}/bad.csv')
+    assert capsys.readouterr().out.startswith('Error on line 41\n')
 
 
 def test_eq():
@@ -71,6 +118,9 @@ def test_smoothed():
     assert elong.smoothed().ys[0] == 0
     aae(sum(elong.smoothed().ys - elong.ys), 0, 2)  # ensure there is no baseline shift
 
+    assert elong.smoothed(5, 'mean').ys[0] == np.mean(elong.ys[:3])
+    assert len(elong.smoothed(5, 'savgol').ys) == len(elong.smoothed(5, 'x').ys) == len(elong.ys)
+
 
 def test_cropped():
     elong = read_prn('tests/test_files/test1.prn')[0]
@@ -83,6 +133,24 @@ def test_cropped():
     aae(cropped.xs + 1.030183, cropped2.xs)
     assert all(cropped.ys == cropped.ys)
 
+    assert len(elong.cropped(1000, 10).xs) == len(elong.xs)
+    assert len(elong.cropped(None, 1000).xs) == len(elong.xs)
+
+    # non-monotonic x-values
+    elong = Elongation([0, 2, 1, 3, 2, 4, 5], np.arange(7), 1, 1, 1)
+    assert not elong.monotonic()
+    assert all(elong.cropped(1, 2.5, shifted=False).xs == [2, 1, 3])
+    assert all(elong.cropped(2, None, shifted=False).xs == [3, 2, 4, 5])
+
+
+def test_cropped_many():
+    elong = read_prn('tests/test_files/test1.prn')[0]
+    assert elong.monotonic()
+
+    windows = [(1, 10), (None, 50), (20, None), (None, None), (100, 50)]
+    for (start, end), cropped in zip(windows, elong.cropped_many(windows)):
+        assert cropped == elong.cropped(start, end)
+
 
 def test_cleaned():
     elong = read_prn('tests/test_files/test1.prn')[0]
@@ -94,6 +162,17 @@ def test_cleaned():
     assert len(elong.cleaned(None, 0.9).xs) == 2331
 
 
+def test_clean_elongations():
+    elongs = read_prn('tests/test_files/test1.prn')
+    for args in [(), (None, None), (0.01, None), (None, 0.5), (0.1, 0.9)]:
+        for elong, cleaned in zip(elongs, clean_elongations(elongs, *args)):
+            assert cleaned == elong.cleaned(*args)
+
+    assert clean_elongations([]) == []
+    with raises(ValueError):
+        clean_elongations([Elongation([0, 1], [np.nan, np.nan], 1, 1, 1)])
+
+
 def test_peaks():
     elong = read_prn('tests/test_files/test1.prn')[0]
     peak_indices, properties = elong.peak_indices()
@@ -116,6 +195,20 @@ def test_youngs_modulus():
     aae(elong.youngs_modulus, 14498.419835141907)
 
 
+def test_fitted_youngs_modulus():
+    elong = read_prn('tests/test_files/test1.prn')[0]
+    aae(elong.fitted_youngs_modulus(), 5576.565432769845)
+    aae(elong.fitted_youngs_modulus(window=5, x_limit=20), 6113.026302706048)
+    aae(elong.fitted_youngs_modulus(x_limit=(5, 20)), 2800.246538093303)
+    assert np.isnan(elong.fitted_youngs_modulus(x_limit=-1))
+
+    cleaned = elong.cleaned()
+    slopes = sliding_slopes(cleaned.xs, cleaned.ys, 3, width=1)
+    aae(cleaned.fitted_youngs_modulus(3, width=1), np.nanmax(slopes)/cleaned.cross_section)
+    with raises(ValueError):
+        Elongation(elong.xs[::-1], elong.ys, 1, 1, 1).fitted_youngs_modulus(width=1)
+
+
 def test_break():
     elong = read_prn('tests/test_files/test1.prn')[0]
     idx = elong.break_index()
@@ -131,3 +224,320 @@ def test_yield():
     aae(elong.ys[idx], 17.3902)
     aae(elong.xs[idx], elong.yield_elongation())
     aae(elong.break_elongation(), elong.yield_elongation())
+
+
+def test_write_csv(tmp_path):
+    elong = read_prn('tests/test_files/test1.prn')[0]
+    outfile = f'{tmp_path}/test1_write.csv'
+    write_csv(elong, outfile)
+
+    lines = open(outfile).read().split('\n')
+    assert lines[0] == f'Break Load, {elong.break_load()}'
+    assert lines[1] == f'Break Strength, {elong.break_strength()}'
+    assert lines[2] == f'Break Elongation, {elong.break_elongation()}'
+    assert lines[3] == f'Yield Load, {elong.yield_load()}'
+    assert lines[4] == f'Yield Strength, {elong.yield_strength()}'
+    assert lines[5] == f'Yield Elongation, {elong.yield_elongation()}'
+    assert lines[11] == '   %,       N'
+    assert lines[12] == '  0.1417,   0.0000'
+    assert len(lines) == 12 + len(elong.xs)
+
+
+def test_summary():
+    elongs = read_prn('tests/test_files/test1.prn')
+    elongs[1].name = 'B'
+    for elong in elongs:
+        summary = elong.summary()
+        assert summary['name'] == elong.name
+        assert summary['yield_elongation'] == elong.yield_elongation()
+        assert summary['yield_strength'] == elong.yield_strength()
+        assert (summary['max_elongation'], summary['max_load']) == elong.max
+        assert summary['break_load'] == elong.break_load()
+        assert summary['break_strength'] == elong.break_strength()
+        assert summary['youngs_modulus'] == elong.youngs_modulus
+    assert np.isnan(Elongation([0, 1, 2], [0, 1, 2], 1, 1, 1).summary()['break_elongation'])
+
+    summaries = ElongationBatch.from_elongations(elongs).summary()
+    assert list(summaries['name']) == [None, 'B', None]
+    assert summaries.dtype.names[1:] == SUMMARY_FIELDS
+    for elong, summary in zip(elongs, summaries):
+        for field in SUMMARY_FIELDS:
+            aae(summary[field], elong.summary()[field])
+
+    # a repeated first point gives a NaN derivative, which both ignore
+    elong = Elongation([0, 0, 1, 2, 3], [1, 1, 2, 5, 6], 1, 1, 1)
+    assert elong.summary()['youngs_modulus'] == 3
+    assert ElongationBatch.from_elongations([elong]).summary()['youngs_modulus'][0] == 3
+
+
+def test_cache():
+    elong = read_prn('tests/test_files/test1.prn')[0]
+
+    with raises(ValueError):
+        elong.ys[0] = 1
+
+    assert elong.peak_indices() is elong.peak_indices()
+    assert elong.peak_indices() is not elong.peak_indices(width=10)
+    assert elong.derivative() is elong.derivative()
+    with raises(ValueError):
+        elong.derivative()[0] = 1
+
+    peaks = elong.peak_indices(height=np.array([1, 100]))  # unhashable kwargs are not cached
+    assert peaks is not elong.peak_indices(height=np.array([1, 100]))
+
+    modulus_array = elong.youngs_modulus_array
+    copy = elong.copy()
+    assert copy.youngs_modulus_array is modulus_array
+
+    modulus = elong.youngs_modulus
+    elong.sample_width *= 2
+    aae(elong.youngs_modulus, modulus/2)
+
+    max_x, max_y = elong.max
+    elong.ys = elong.ys*2
+    assert elong.max == (max_x, 2*max_y)
+    assert copy.max == (max_x, max_y)
+
+
+def test_elongation_batch():
+    elongs = read_prn('tests/test_files/test1.prn')
+    elongs[1].name = 'B'
+    batch = ElongationBatch.from_elongations(elongs)
+    assert len(batch) == 3
+    assert all(batch.lengths == [2344, 73, 65])
+    assert batch.to_elongations() == elongs
+    assert batch[1] == elongs[1]
+    assert batch[-1] == elongs[2] and batch[-3] == elongs[0]
+    for i in [3, -4]:
+        with raises(IndexError):
+            batch[i]
+
+    max_xs, max_ys = batch.max
+    for elong, max_x, max_y in zip(elongs, max_xs, max_ys):
+        assert elong.max == (max_x, max_y)
+    aae(batch.cross_section, [elong.cross_section for elong in elongs])
+
+    moduli, offsets = batch.youngs_modulus_array()
+    for i, elong in enumerate(elongs):
+        aae(moduli[offsets[i]:offsets[i + 1]], elong.youngs_modulus_array)
+    aae(batch.youngs_modulus()[0], elongs[0].youngs_modulus)
+    for kwargs in [{}, {'window': 70}, {'x_limit': (5, 20)}]:
+        np.testing.assert_allclose(
+            batch.fitted_youngs_modulus(**kwargs), [elong.fitted_youngs_modulus(**kwargs) for elong in elongs]
+        )
+    cleaned = clean_elongations(elongs)
+    for kwargs in [{'width': 1}, {'window': 5, 'width': 2, 'x_limit': 20}]:
+        np.testing.assert_allclose(
+            ElongationBatch.from_elongations(cleaned).fitted_youngs_modulus(**kwargs),
+            [elong.fitted_youngs_modulus(**kwargs) for elong in cleaned],
+        )
+
+    for method in ['convolve', 'mean', 'savgol']:
+        for elong, smoothed in zip(elongs, batch.smoothed(5, method).to_elongations()):
+            aae(smoothed.ys, elong.smoothed(5, method).ys)
+            assert all(smoothed.xs == elong.xs)
+
+    for args in [(), (None, None), (0.1, 0.9, False)]:
+        for elong, cleaned in zip(elongs, batch.cleaned(*args).to_elongations()):
+            assert cleaned == elong.cleaned(*args)
+
+    cropped = batch.cropped_index([None, 2, -10], [5, None, 100], shifted=False)
+    assert cropped[0] == elongs[0].cropped_index(None, 5, shifted=False)
+    assert cropped[1] == elongs[1].cropped_index(2, None, shifted=False)
+    assert cropped[2] == elongs[2].cropped_index(-10, 100, shifted=False)
+
+    assert len(ElongationBatch.from_elongations([])) == 0
+    with raises(AssertionError):
+        ElongationBatch.from_elongations([elongs[0], elongs[1].cropped_index(0, 0, shifted=False)]).derivative()
+
+
+def test_average_elongations():
+    elongs = clean_elongations(read_prn('tests/test_files/test1.prn'))
+    batch = ElongationBatch.from_elongations(elongs)
+
+    grid, ys = batch.resampled(points=11)
+    aae(grid, np.linspace(0, max(elong.xs[-1] for elong in elongs), 11))
+    assert ys.shape == (3, 11)
+    for elong, row in zip(elongs, ys):
+        aae(row, np.interp(grid, elong.xs, elong.ys, right=np.nan))
+
+    averaged = average_elongations(elongs, grid, percentiles=(5, 50), name='mean')
+    assert isinstance(averaged, Elongation) and averaged.name == 'mean'
+    assert all(averaged.xs == grid)
+    aae(averaged.ys, np.nanmean(ys, axis=0))
+    aae(averaged.std, np.nanstd(ys, axis=0))
+    aae(averaged.bands[50], np.nanmedian(ys, axis=0))
+    assert list(averaged.counts) == [3]*7 + [2] + [1]*3
+    assert averaged.copy().bands is averaged.bands
+
+    with raises(ValueError):
+        ElongationBatch.from_elongations(elongs + [Elongation([2, 1], [1, 2], 1, 1, 1)]).resampled()
+
+
+def test_elb(tmp_path):
+    elong = read_prn('tests/test_files/test1.prn')[0]
+    elong.name = 'A'
+    outfile = f'{tmp_path}/test1.elb'
+    elong.write(outfile)
+
+    with open(outfile, 'rb') as f:
+        assert f.readline().startswith(b'elb:1|')
+        assert f.tell() % 64 == 0
+
+    read, *others = read_elongation(outfile)
+    assert len(others) == 0
+    assert read == elong
+    assert isinstance(read.xs.base, np.memmap) or isinstance(read.xs, np.memmap)
+    assert not read.ys.flags.writeable
+    aae(read.youngs_modulus, elong.youngs_modulus)
+
+    assert read_elb(outfile, memory_map=False)[0] == elong
+    assert pickle.loads(pickle.dumps(read)) == elong
+
+    empty = Elongation([], [], 1, 2, 3)
+    write_elb(empty, outfile)
+    assert read_elb(outfile)[0] == empty
+
+
+def test_index_prn(tmp_path):
+    file_name = f'{tmp_path}/test1.prn'
+    open(file_name, 'w').write(open('tests/test_files/test1.prn').read())
+    elongs = read_prn(file_name)
+
+    index = index_prn(file_name)
+    assert len(index) == 3
+    assert load_prn_index(file_name) is None
+    with open(file_name, 'rb') as f:
+        f.seek(index[1]['header'])
+        assert f.readline().strip() == b'{6|'
+        f.seek(index[2]['results'])
+        assert f.readline().strip() == b'{6|'
+
+    for i, elong in enumerate(elongs):
+        assert read_prn_test(file_name, i, index) == elong
+
+    assert index_prn(file_name, save=True) == index
+    assert load_prn_index(file_name) == index
+    assert read_prn_test(file_name, 2) == elongs[2]
+
+    with open(file_name, 'a') as f:
+        f.write('\n')
+    assert load_prn_index(file_name) is None
+
+
+def test_scan_elongation(tmp_path):
+    elongs = read_prn('tests/test_files/test1.prn')
+    scanned = scan_elongation('tests/test_files/test1.prn')
+    assert len(scanned) == 3
+    for elong, lazy in zip(elongs, scanned):
+        assert not lazy.loaded
+        assert (lazy.gauge_length, lazy.sample_width) == (elong.gauge_length, elong.sample_width)
+        assert lazy.metadata['film']['Sample_Length'] == '60.00'
+        assert lazy.metadata['test_info']['Technician'] == 'a'
+        assert lazy.metadata['results']['date'] == datetime(2019, 8, 21)
+    assert scanned[1].metadata['data']['crosshead_speed'] == 21.26
+    assert scanned[2].metadata['results']['break_load'] == 44.2093
+
+    lazy = pickle.loads(pickle.dumps(scanned[1]))
+    assert not lazy.loaded
+    assert lazy == elongs[1]
+    assert lazy.loaded
+    assert scanned[1].cropped(1, 10) == elongs[1].cropped(1, 10)
+
+    csv, = scan_elongation('tests/test_files/test1.csv')
+    assert csv.metadata['break_load'] == '16.901'
+    assert csv == read_csv('tests/test_files/test1.csv')[0]
+
+    elongs[0].write(f'{tmp_path}/test1.elb')
+    elb, = scan_elongations([f'{tmp_path}/test1.elb', 'tests/test_files/test1.csv'])[:1]
+    assert elb.metadata['points'] == len(elongs[0].xs)
+    assert elb == elongs[0]
+
+    with raises(AttributeError):
+        scanned[0].spam
+
+
+def test_convert_elongations(tmp_path, monkeypatch):
+    file_names = [f'{tmp_path}/test1.prn', f'{tmp_path}/test2.csv']
+    open(file_names[0], 'w').write(open('tests/test_files/test1.prn').read())
+    open(file_names[1], 'w').write(open('tests/test_files/test1.csv').read())
+    manifest = f'{tmp_path}/manifest.json'
+
+    summary = convert_elongations(file_names, 'elb', manifest=manifest)
+    assert (summary['converted'], summary['skipped'], summary['failed']) == (2, 0, 0)
+    assert summary['points'] == 2344 + 73 + 65 + 2344
+
+    summary = convert_elongations(file_names, 'elb', manifest=manifest, use_hash=True)
+    assert (summary['converted'], summary['skipped']) == (0, 2)
+
+    # converting to a new style or losing an output requires conversion
+    assert convert_elongations(file_names, 'csv', manifest=manifest, use_hash=True)['converted'] == 2
+    os.remove(f'{tmp_path}/test1-2.csv')
+    assert convert_elongations(file_names, 'csv', manifest=manifest, use_hash=True)['converted'] == 1
+
+    # touched, but unchanged, files are only skipped if comparing hashes
+    os.utime(file_names[1], ns=(0, 0))
+    assert convert_elongations(file_names, 'csv', manifest=manifest, use_hash=True)['skipped'] == 2
+    os.utime(file_names[1], ns=(1, 1))
+    assert convert_elongations(file_names, 'csv', manifest=manifest)['converted'] == 1
+
+    with open(file_names[1], 'a') as f:
+        f.write('\n')
+    assert convert_elongations(file_names, 'csv', manifest=manifest, use_hash=True)['converted'] == 1
+
+    # without a manifest, nothing is recorded (or hashed)
+    monkeypatch.setattr('elongation.elongation.file_hash', None)
+    assert convert_elongations(file_names, 'csv', use_hash=True)['converted'] == 2
+
+    with warns(UserWarning):
+        summary = convert_elongations([*file_names, f'{tmp_path}/missing.csv'], n_jobs=2)
+    assert (summary['converted'], summary['skipped'], summary['failed']) == (2, 0, 1)
+
+
+def test_parse_cache(tmp_path, monkeypatch):
+    file_name = f'{tmp_path}/test1.prn'
+    open(file_name, 'w').write(open('tests/test_files/test1.prn').read())
+    elongs = read_prn(file_name)
+
+    cache = ParseCache(f'{tmp_path}/cache')
+    assert read_elongation(file_name, cache=cache) == elongs
+    assert len(cache.entries()) == 1
+    cached = cache.get(cache.key(file_name))
+    assert cached == elongs
+    assert not cached[0].xs.flags.writeable
+    assert read_elongations([file_name], n_jobs=2, cache=f'{tmp_path}/cache') == elongs
+
+    # changes to the file are never served from the cache
+    with open(file_name, 'w') as f:
+        f.write(open('tests/test_files/test1.prn').read().replace('Grip_Separation = 60.000', 'Grip_Separation = 50.000', 1))
+    assert read_elongation(file_name, cache=cache)[0].gauge_length == 0.05
+    assert len(cache.entries()) == 2
+
+    # least recently used entries are evicted
+    csv_name = 'tests/test_files/test1.csv'
+    os.utime(f'{tmp_path}/cache/{cache.key(file_name)}', ns=(0, 0))
+    cache.max_size = cache.size
+    read_elongation(csv_name, cache=cache)
+    assert cache.get(cache.key(file_name)) is None
+    assert cache.get(cache.key(csv_name)) == read_csv(csv_name)
+    assert cache.size <= cache.max_size
+
+    # puts only scan the cache when the ledger exceeds max_size, then evict down to low_water
+    cache.clear()
+    cache.ledger_lines = 4
+    cache.put('key-0', elongs[1:])
+    cache.max_size = 10.5*cache.size
+    scans = []
+    entries = cache.entries
+    monkeypatch.setattr(cache, 'entries', lambda: scans.append(1) or entries())
+    for i in range(1, 12):
+        cache.put(f'key-{i}', elongs[1:])
+        assert sum(cache._read_ledger()) == sum(size for _, size, _ in entries())
+        assert sum(cache._read_ledger()) <= cache.max_size
+    assert len(scans) == 1
+    assert len(entries()) == 8
+    assert len(cache._read_ledger()) <= cache.ledger_lines
+
+    cache.clear()
+    assert entries() == []
+    assert cache._read_ledger() == [0]
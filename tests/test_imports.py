@@ -0,0 +1,43 @@
+import os
+import sys
+import subprocess
+
+sys.path.insert(0, '..')
+
+from pytest import mark
+
+# slow to import, so only loaded on the code paths that need them
+LAZY_MODULES = ('matplotlib', 'more_itertools', 'scipy')
+
+
+def imported_modules(*args):
+    """
+    Run python with -X importtime and determine the top-level modules that were imported.
+
+    :param args: arguments to python
+    :return: set of imported top-level module names
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', *args],
+        capture_output=True, text=True, check=True,
+        env={**os.environ, 'PYTHONPATH': os.getcwd()},
+    )
+    return {
+        line.split('|')[-1].strip().split('.')[0]
+        for line in process.stderr.splitlines() if line.startswith('import time:')
+    }
+
+
+def test_lazy_imports():
+    modules = imported_modules('-c', 'import elongation.elongation, elongation.synthetic, elongation.tools')
+    assert 'numpy' in modules
+    assert not modules.intersection(LAZY_MODULES)
+
+    modules = imported_modules('-c', 'import elongation.plot')
+    assert 'matplotlib' in modules
+    assert not modules.intersection({'more_itertools', 'scipy'})
+
+
+@mark.parametrize('script', ['convert_elongation', 'plot_elongation', 'report_elongation'])
+def test_script_help_imports(script):
+    assert not imported_modules(f'bin/{script}', '--help').intersection(LAZY_MODULES)
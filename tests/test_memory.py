@@ -0,0 +1,75 @@
+import sys
+
+sys.path.insert(0, '..')
+
+from elongation.elongation import *
+from elongation.synthetic import synthetic_elongations, write_synthetic_csv, write_synthetic_prn
+from elongation.tools import peak_memory
+
+# number of points in the files and Elongations measured
+POINTS = 200000
+
+# peak memory budgets (in bytes per point), an array of floats is 8 bytes per point
+MEMORY_BUDGETS = {
+    'read_prn': 48,  # includes the buffer of the text being converted
+    'read_csv': 40,  # includes the buffer of the text being converted
+    'read_elb': 1,  # memory-mapped
+    'write_csv': 16,  # includes the buffer of the text being formatted
+    'write_elb': 10,
+    'copy': 1,  # the (read-only) data are shared
+    'smoothed': 20,
+    'cropped_index': 20,
+    'cleaned': 20,
+    'peak_indices': 28,
+    'fitted_youngs_modulus': 96,
+    'summary': 28,
+}
+
+
+def check_budget(name, function, *args, **kwargs):
+    """
+    Check that the peak memory of a function is within its budget.
+
+    :param name: name of the budget
+    :param function: function to measure
+    :return: result of the function
+    """
+    result, peak = peak_memory(function, *args, **kwargs)
+    assert peak/POINTS <= MEMORY_BUDGETS[name], \
+        f'{name} used {peak/POINTS:.1f} bytes per point (budget: {MEMORY_BUDGETS[name]})'
+    return result
+
+
+def fresh(elong):
+    """
+    :return: copy of the Elongation without any cached values
+    """
+    return Elongation(elong.xs, elong.ys, elong.gauge_length, elong.sample_width, elong.sample_thickness)
+
+
+def test_read_memory(tmp_path):
+    write_synthetic_prn(f'{tmp_path}/synthetic.prn', 1, POINTS)
+    write_synthetic_csv(f'{tmp_path}/synthetic.csv', POINTS)
+
+    elong, = check_budget('read_prn', read_prn, f'{tmp_path}/synthetic.prn')
+    check_budget('read_csv', read_csv, f'{tmp_path}/synthetic.csv')
+    elong.write(f'{tmp_path}/synthetic.elb')
+    check_budget('read_elb', read_elb, f'{tmp_path}/synthetic.elb')
+
+
+def test_write_memory(tmp_path):
+    elong, = synthetic_elongations(1, POINTS)
+    elong.peak_indices()  # measured separately
+    check_budget('write_csv', write_csv, elong, f'{tmp_path}/synthetic.csv')
+    check_budget('write_elb', write_elb, elong, f'{tmp_path}/synthetic.elb')
+
+
+def test_transform_memory():
+    elong, = synthetic_elongations(1, POINTS)
+    check_budget('copy', elong.copy)
+    check_budget('smoothed', elong.smoothed)
+    check_budget('cropped_index', elong.cropped_index, 100, POINTS - 100)
+    check_budget('cleaned', fresh(elong).cleaned)
+    check_budget('peak_indices', fresh(elong).peak_indices)
+    check_budget('fitted_youngs_modulus', fresh(elong).fitted_youngs_modulus)
+    check_budget('summary', fresh(elong).summary)
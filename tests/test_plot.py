@@ -2,6 +2,9 @@ import sys
 
 import matplotlib.pyplot as plt
 
+from matplotlib.colors import to_rgba
+from numpy.testing import assert_almost_equal as aae
+
 sys.path.insert(0, '..')
 
 from elongation.plot import *
@@ -54,3 +57,73 @@ def test_plotter(tmp_path):
         legend=False, colors='b', markers='x', linestyles='--',
         savefig=f'{tmp_path}/my_elongation_figure_2.png',
     )
+
+    fig, ax = plotter(elongs, smoothed={'box_pts': 5, 'method': 'mean'}, legend=False)
+    aae(ax.get_lines()[0].get_ydata(), elongs[0].smoothed(5, 'mean').ys)
+
+
+def test_plot_elongation_decimate():
+    elong = read_prn('tests/test_files/test1.prn')[0]
+
+    fig, ax = plt.subplots()
+    plot_elongation(elong, ax, decimate={'points': 100}, peaks={'print': False})
+    line, = ax.get_lines()
+    assert len(line.get_xdata()) <= 102
+    assert max(line.get_ydata()) == max(elong.ys)
+
+    plot_elongation(elong, ax, decimate={'points': 100, 'method': 'lttb'})
+    assert len(ax.get_lines()[1].get_xdata()) == 100
+
+    plot_elongation(elong, ax, decimate=True)
+    assert len(ax.get_lines()[2].get_xdata()) <= 2*ax.bbox.width + 2
+
+
+def test_plot_elongations_collection():
+    elongs = [elong.copy() for elong in read_prn('tests/test_files/test1.prn')*10]
+    for i, elong in enumerate(elongs):
+        elong.name = f'{i}'
+
+    fig, ax = plt.subplots()
+    lines = plot_elongations(
+        elongs, ax,
+        colors=['r', 'b'], linestyles=['-', '--'], markers=[None, 'o'],
+        peaks={'print': False, 'labels': False}, youngs_modulus={'print': False, 'labels': False},
+        collection=True, legend_limit=5,
+    )
+    assert len(lines.get_segments()) == 30
+    assert len(ax.collections) == 5  # curves, markers, peaks, modulus, tangents
+
+    handles, labels = ax.get_legend_handles_labels()
+    assert labels == ['0', '1', '2', '3', '4', '... 25 more']
+    assert handles[1].get_color() == 'b'
+
+    fig, ax = plt.subplots()
+    plotter(elongs[:3], plot=(fig, ax), collection=True, decimate={'points': 50})
+    assert all(len(segment) <= 52 for segment in ax.collections[0].get_segments())
+
+    # both modes take the default colors from the axis color cycle
+    fig, ax = plt.subplots()
+    plot_elongations(elongs[:3], ax, colors=[None, 'k'])
+    colors = [to_rgba(line.get_color()) for line in ax.lines]
+    lines = plot_elongations(elongs[3:6], ax, colors=[None, 'k'], collection=True)
+    fig, ax = plt.subplots()
+    plot_elongations(elongs[:3], ax, colors=[None, 'k'], collection=True)
+    assert [tuple(c) for c in ax.collections[0].get_colors()] == colors
+    assert lines.get_colors()[0].tolist() != colors[0]
+
+
+def test_plot_report(tmp_path):
+    elongs = [elong.copy() for elong in read_prn('tests/test_files/test1.prn')*3]
+
+    page = render_page(elongs[:3], rows=2, cols=2, panel_size=(2, 1.5), dpi=50)
+    assert page.shape == (150, 200, 4)
+
+    assert plot_report(elongs, f'{tmp_path}/report.pdf', rows=2, cols=2, dpi=50) == [f'{tmp_path}/report.pdf']
+    with open(f'{tmp_path}/report.pdf', 'rb') as f:
+        assert b'/Count 3' in f.read()
+
+    files = plot_report(elongs, f'{tmp_path}/report.png', rows=1, cols=4, dpi=50, n_jobs=2)
+    assert files == [f'{tmp_path}/report-1.png', f'{tmp_path}/report-2.png', f'{tmp_path}/report-3.png']
+    assert plt.imread(files[0]).shape[:2] == (240, 1280)
+
+    assert plot_report(elongs[:2], f'{tmp_path}/single.png', cols=2, dpi=50) == [f'{tmp_path}/single.png']
@@ -0,0 +1,38 @@
+import sys
+import numpy as np
+
+sys.path.insert(0, '..')
+
+from elongation.elongation import read_csv, read_prn
+from elongation.synthetic import *
+
+
+def test_synthetic_curve():
+    times, loads = synthetic_curve(5000, 1)
+    assert len(times) == len(loads) == 5000
+    assert all(np.diff(times) > 0)
+    assert np.allclose(loads/LOAD_RESOLUTION, np.round(loads/LOAD_RESOLUTION))
+
+    times2, loads2 = synthetic_curve(5000, 1)
+    assert all(times == times2) and all(loads == loads2)
+
+
+def test_synthetic_elongations():
+    elongs = synthetic_elongations(3, 2000, seed=2)
+    assert len(elongs) == 3
+    assert elongs[0] != elongs[1]
+    for elong in elongs:
+        summary = elong.summary()
+        assert 0 < summary['yield_elongation'] < summary['break_elongation']
+        assert summary['max_load'] > 0
+        assert len(elong.cleaned().xs) < len(elong.xs)
+
+
+def test_write_synthetic(tmp_path):
+    write_synthetic_prn(f'{tmp_path}/synthetic.prn', 3, 2000, seed=2)
+    assert read_prn(f'{tmp_path}/synthetic.prn') == synthetic_elongations(3, 2000, seed=2)
+
+    write_synthetic_csv(f'{tmp_path}/synthetic.csv', 2000, seed=2)
+    elong, = read_csv(f'{tmp_path}/synthetic.csv')
+    synthetic, = synthetic_elongations(1, 2000, seed=2)
+    assert np.allclose(elong.xs, synthetic.xs, atol=1e-4) and all(elong.ys == synthetic.ys)
@@ -1,11 +1,19 @@
 import sys
 import numpy as np
+import tracemalloc
+import warnings
 
 from datetime import datetime
+from numpy.testing import assert_almost_equal as aae
 
 sys.path.insert(0, '..')
 
-from elongation.tools import compare_dictionaries
+from pytest import raises, warns
+
+from elongation.tools import (MyIter, compare_dictionaries, decimate_curve, enable_profiling, first_true,
+                              format_profile, map_files, peak_memory, prefetched, profile_stage,
+                              profile_stats, profiled, profiling, read_points, reset_profile,
+                              segment_first_true, segment_smooth_curve, sliding_slopes, smooth_curve)
 
 
 def test_compare_dictionaries():
@@ -56,3 +64,284 @@ def test_compare_dictionaries():
 
     assert not cd(m, n)
     assert cd(m, {**n, 2: {2: np.array([1, 2, 3])}})
+
+
+def test_my_iter_take():
+    it = MyIter(['a\n', 'b\n', 'c\n', 'd\n'])
+    assert next(it) == 'a\n'
+    assert it.peek() == 'b\n'
+    assert it.take(2) == ['b\n', 'c\n']
+    assert it._index == 3
+    assert it._line == 'c\n'
+    assert it.take(5) == ['d\n']
+    assert it.take(1) == []
+
+
+def test_my_iter_take_points():
+    it = MyIter([f'{i}, {2*i}\n' for i in range(10)] + [']\n'])
+    points = it.take_points(10, chunk_size=3)
+    aae(points, [[i, 2*i] for i in range(10)])
+    assert it._index == 10
+    assert next(it) == ']\n'
+    with raises(AssertionError):
+        MyIter(['1, 2\n']).take_points(2)
+
+    it = MyIter(['1, 2\n', '3, 4, 5\n', '6, 7\n', '8, 9\n'])
+    with raises(AssertionError):
+        it.take_points(4)
+    assert it._index == 2 and it._line == '3, 4, 5\n'
+
+
+def test_my_iter_read_chunks(tmp_path):
+    with open(f'{tmp_path}/lines.txt', 'w') as f:
+        f.write(''.join(f'{i}, {2*i}\n' for i in range(100)))
+
+    with open(f'{tmp_path}/lines.txt') as f:
+        it = MyIter(f)
+        assert next(it) == '0, 0\n'
+        assert it.peek() == '1, 2\n'
+        chunks = list(it.read_chunks(50))
+        assert all(chunk.endswith('\n') for chunk in chunks)
+        assert ''.join(chunks) == ''.join(f'{i}, {2*i}\n' for i in range(1, 100))
+        assert it._index == 100
+
+    it = MyIter(['a\n', 'b\n'])
+    assert list(it.read_chunks()) == ['a\nb\n']
+
+
+def test_peak_memory(monkeypatch):
+    result, peak = peak_memory(np.ones, 10**6)
+    assert len(result) == 10**6
+    assert 8*10**6 <= peak < 9*10**6
+    assert peak_memory(sum, [1, 2])[0] == 3
+
+    # tracemalloc.reset_peak() is new in Python 3.9
+    monkeypatch.delattr('tracemalloc.reset_peak', raising=False)
+    tracemalloc.start()
+    try:
+        assert 8*10**6 <= peak_memory(np.ones, 10**6)[1] < 9*10**6
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_profiling(tmp_path):
+    @profiled('double', points=lambda result, xs: len(xs))
+    def double(xs):
+        return [2*x for x in xs]
+
+    assert double([1, 2]) == [2, 4]
+    assert profile_stats() == {}
+
+    enable_profiling()
+    try:
+        double([1, 2])
+        double([3])
+        with profile_stage('block', points=5):
+            pass
+        stats = profile_stats()
+        assert stats['double']['calls'] == 2
+        assert stats['double']['points'] == 3
+        assert stats['block'] == {'time': stats['block']['time'], 'calls': 1, 'points': 5}
+        assert 'double' in format_profile()
+
+        reset_profile()
+        assert profile_stats() == {}
+
+        from elongation.elongation import read_prn
+        elong, *_ = read_prn('tests/test_files/test1.prn')
+        elong.peak_indices()
+        stats = profile_stats()
+        assert stats['read_prn']['calls'] == 1
+        assert stats['convert']['points'] == stats['read_prn']['points'] > 0
+        assert stats['find_peaks'] == {'time': stats['find_peaks']['time'], 'calls': 1, 'points': len(elong.xs)}
+    finally:
+        enable_profiling(False)
+    assert profile_stats() == {}
+
+    cprofile = tmp_path / 'stats.prof'
+    with profiling(stages=False, cprofile=cprofile):
+        double([1])
+    assert cprofile.exists()
+    assert profile_stats() == {}
+
+    # profiling is restored to its previous state on exit
+    with profiling():
+        double([1])
+        assert profile_stats()['double']['calls'] == 1
+    assert profile_stats() == {}
+    enable_profiling()
+    try:
+        with profiling():
+            double([1])
+        assert profile_stats()['double']['calls'] == 1
+    finally:
+        enable_profiling(False)
+
+
+def test_read_points():
+    points = read_points('  0.1800,   0.0000\n  0.2720,   0.0445\n\n')
+    assert points.shape == (2, 2)
+    assert all(points[:, 0] == [0.18, 0.272])
+    assert all(points[:, 1] == [0, 0.0445])
+
+    assert read_points('').shape == (0, 2)
+    assert read_points('1 2 3\n4 5 6', columns=3, separator=' ').shape == (2, 3)
+
+    with raises(AssertionError):
+        read_points('1, 2, 3\n')
+    # rows with the wrong number of columns are not absorbed by the other rows
+    for text in ['1, 2\n3, 4, 5\n6, 7\n', '1, 2\n3\n4\n5, 6\n']:
+        with raises(AssertionError):
+            read_points(text)
+    with raises(ValueError):
+        read_points('1, 2\nspam, 4\n')
+
+
+def test_read_points_deprecated(monkeypatch):
+    # NumPy < 2 stops at unparsable text with only a DeprecationWarning
+    def fromstring(text, sep):
+        warnings.warn('string or file could not be read to its end', DeprecationWarning)
+        return np.array([1.0, 2.0])
+
+    monkeypatch.setattr(np, 'fromstring', fromstring)
+    with raises(ValueError):
+        read_points('1, 2\nspam, 4\n')
+
+
+def test_first_true():
+    assert first_true(np.array([False, True, True])) == 1
+    assert first_true(np.array([False, False])) is None
+    assert first_true(np.array([False, False]), 2) == 2
+    assert first_true(np.array([], dtype=bool), 0) == 0
+
+
+def test_segment_first_true():
+    mask = np.array([False, True, True, False, False, False, True])
+    assert all(segment_first_true(mask, [0, 2, 3, 6], [3, 3, 6, 7]) == [1, 2, -1, 6])
+    assert all(segment_first_true(mask, [3], [3]) == [-1])
+
+
+def test_map_files():
+    assert list(map_files(len, ['a', 'bb', 'ccc'])) == [('a', 1), ('bb', 2), ('ccc', 3)]
+    assert list(map_files(len, ['a', 'bb', 'ccc'], n_jobs=2)) == [('a', 1), ('bb', 2), ('ccc', 3)]
+
+    with raises(TypeError):
+        list(map_files(len, ['a', 1]))
+    with warns(UserWarning):
+        assert list(map_files(len, ['a', 1, 'ccc'], n_jobs=2, errors='warn')) == [('a', 1), ('ccc', 3)]
+    with raises(ValueError):
+        list(map_files(len, ['a'], errors='ignore'))
+
+
+def test_prefetched():
+    pulled = []
+
+    def source():
+        for i in range(5):
+            pulled.append(i)
+            yield i
+
+    it = prefetched(source(), 2)
+    assert next(it) == 0
+    assert pulled == [0, 1, 2]
+    assert list(it) == [1, 2, 3, 4]
+    assert list(prefetched([], 2)) == []
+
+
+def test_segment_smooth_curve():
+    segments = [np.arange(10.0)**2, np.array([1.0, 5, np.nan, 2, 8, 3, 3])]
+    offsets = [0, 10, 17]
+    smoothed = segment_smooth_curve(np.concatenate(segments), offsets, 3)
+    aae(smoothed[:10], smooth_curve(segments[0], 3))
+    aae(smoothed[10:], smooth_curve(segments[1], 3))
+    assert np.isnan(smoothed[11:14]).all()
+
+    xs = np.concatenate([np.arange(10.0), np.arange(7.0)])
+    for method in ['mean', 'savgol', 'x']:
+        smoothed = segment_smooth_curve(np.concatenate(segments), offsets, 3, method, xs)
+        aae(smoothed[:10], smooth_curve(segments[0], 3, method, xs[:10]))
+        aae(smoothed[10:], smooth_curve(segments[1], 3, method, xs[10:]))
+
+
+def test_smooth_curve():
+    ys = np.array([3.0, 1, 4, 1, 5, 9, 2, 6])
+    aae(smooth_curve(ys, 3), [4/3, 8/3, 2, 10/3, 5, 16/3, 17/3, 8/3])
+    aae(smooth_curve(ys, 3, 'mean'), [2, 8/3, 2, 10/3, 5, 16/3, 17/3, 4])
+
+    quadratic = np.arange(8.0)**2
+    aae(smooth_curve(quadratic, 5, 'savgol'), quadratic)
+    aae(smooth_curve(ys[:2], 5, 'savgol'), ys[:2])
+
+    # non-uniform spacing: the box covers 3 median spacings (3) in x
+    xs = np.array([0.0, 1, 2, 3, 4, 10, 11, 12])
+    aae(smooth_curve(ys, 3, 'x', xs), [2, 8/3, 2, 10/3, 3, 5.5, 17/3, 4])
+
+    with raises(ValueError):
+        smooth_curve(ys, 3, 'x')
+    with raises(ValueError):
+        smooth_curve(ys, 3, 'x', xs[::-1])
+    with raises(ValueError):
+        smooth_curve(ys, 3, 'median')
+
+
+def test_decimate_curve():
+    xs = np.linspace(0, 10, 10001)
+    ys = np.sin(xs)
+    ys[5000] = 10
+    ys[7000] = np.nan
+
+    for method in ['minmax', 'lttb']:
+        idxs = decimate_curve(xs, ys, 100, method)
+        assert len(idxs) <= 102
+        assert idxs[0] == 0 and idxs[-1] == 10000
+        assert 5000 in idxs
+        assert all(np.diff(idxs) > 0)
+
+    assert all(decimate_curve(xs[:50], ys[:50], 100) == np.arange(50))
+    with raises(ValueError):
+        decimate_curve(xs, ys, 100, 'spam')
+
+
+def test_sliding_slopes():
+    xs = np.cumsum(np.linspace(0.5, 1.5, 50))
+    ys = 3*xs + np.sin(xs)
+    slopes = sliding_slopes(xs, ys, 5)
+    assert len(slopes) == 46
+    aae(slopes, [np.polyfit(xs[i:i + 5], ys[i:i + 5], 1)[0] for i in range(46)])
+
+    ys[10] = np.nan
+    slopes = sliding_slopes(xs, ys, 5, mask=xs < xs[40])
+    assert np.isnan(slopes[6:11]).all() and not np.isnan(slopes[5]) and not np.isnan(slopes[11])
+    assert np.isnan(slopes[36:]).all() and not np.isnan(slopes[35])
+
+    assert len(sliding_slopes(xs[:3], ys[:3], 5)) == 0
+    with raises(ValueError):
+        sliding_slopes(xs, ys, 1)
+
+    # windows of a width in x
+    ys = 3*xs + np.sin(xs)
+    slopes = sliding_slopes(xs, ys, 3, width=4)
+    for i, slope in enumerate(slopes):
+        window = (xs >= xs[i]) & (xs <= xs[i] + 4)
+        if window.sum() < 3:
+            assert np.isnan(slope)
+        else:
+            aae(slope, np.polyfit(xs[window], ys[window], 1)[0])
+    with raises(ValueError):
+        sliding_slopes(xs[::-1], ys, 3, width=4)
+
+
+def test_sliding_slopes_precision():
+    # long curves, with large strains, must not lose precision
+    rng = np.random.default_rng(0)
+    xs = np.sort(np.linspace(0, 1300, 10**6) + rng.normal(0, 1e-4, 10**6))
+    ys = 30*np.tanh(xs/20) + 0.01*xs + rng.normal(0, 0.01, 10**6)
+    slopes = sliding_slopes(xs, ys, 10)
+
+    idxs = np.append(np.arange(0, len(slopes), 997), np.argmax(slopes))
+    windows = idxs[:, None] + np.arange(10)
+    x = xs[windows] - xs[windows].mean(axis=1, keepdims=True)
+    y = ys[windows] - ys[windows].mean(axis=1, keepdims=True)
+    exact = (x*y).sum(axis=1)/(x*x).sum(axis=1)
+    assert np.abs(slopes[idxs] - exact).max() < 1e-6*np.abs(exact).max()